@@ -0,0 +1,134 @@
+from maze import Maze
+from robot import Robot
+from tester import run_trial
+from solutioncache import get_solution
+from realtime import late_policies, format_stats
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import contextlib
+import csv
+import functools
+import json
+import os
+import random
+
+# columns written to CSV result files
+csv_fields = ['maze', 'seed', 'randomness', 'dim', 'score', 'run0_time',
+              'run1_time', 'hit_goal', 'total_time', 'run0_moves',
+              'run1_moves', 'wall_time', 'min_score']
+# extra columns in deadline mode
+csv_latency_fields = ['late', 'stalls', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+
+def make_robot(maze_dim, randomness=0, plan_budget=None, plan_time=None):
+    return Robot(maze_dim, randomness=randomness, plan_budget=plan_budget, plan_time=plan_time)
+
+def run_job(job):
+    '''
+    Runs a single (maze file, seed, randomness, deadline, late policy,
+    planning budget, planning time, solution) trial in the current process
+    and returns the run_trial result extended with the job parameters. With
+    solution set, min_score is looked up in the on-disk solution cache;
+    otherwise it is None. The robot's own progress printing is discarded.
+    '''
+    filename, seed, randomness, deadline, late_policy, plan_budget, plan_time, solution = job
+    random.seed(seed)
+    maze = Maze(filename)
+    robot_factory = functools.partial(make_robot, randomness=randomness,
+                                      plan_budget=plan_budget, plan_time=plan_time)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = run_trial(maze, robot_factory, deadline=deadline, late_policy=late_policy)
+    result['maze'] = filename
+    result['seed'] = seed
+    result['randomness'] = randomness
+    result['min_score'] = float(get_solution(maze)['min_score']) if solution else None
+    return result
+
+def run_batch(filenames, seeds=(0,), randomness=0, workers=None, deadline=None, late_policy='noop',
+              plan_budget=None, plan_time=None, solution=False):
+    '''
+    Runs every maze file with every seed across a process pool, using up to
+    workers processes (all cores by default). Results are returned in job
+    order: all seeds of the first maze, then all seeds of the next one.
+    deadline and late_policy are passed on to run_trial; with a deadline
+    each trial runs its robot in one more process, so fewer workers give
+    steadier latencies. plan_budget and plan_time (seconds) are passed on
+    to every Robot. solution adds each maze's minimum possible score, from
+    the solution cache.
+    '''
+    jobs = [(filename, seed, randomness, deadline, late_policy, plan_budget, plan_time, solution)
+            for filename in filenames for seed in seeds]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_job, jobs, chunksize=chunksize))
+
+def csv_row(result):
+    runtimes = result['runtimes'] + [None] * (2 - len(result['runtimes']))
+    moves = result['moves'] + [None] * (2 - len(result['moves']))
+    row = {'maze': result['maze'], 'seed': result['seed'],
+           'randomness': result['randomness'], 'dim': result['dim'],
+           'score': result['score'], 'run0_time': runtimes[0],
+           'run1_time': runtimes[1], 'hit_goal': all(result['hit_goal']),
+           'total_time': result['total_time'], 'run0_moves': moves[0],
+           'run1_moves': moves[1], 'wall_time': result['wall_time'],
+           'min_score': result['min_score']}
+    if 'latency' in result:
+        for field in csv_latency_fields:
+            row[field] = result['latency'].get(field)
+    return row
+
+def write_json(results, filename):
+    with open(filename, 'w') as f_out:
+        json.dump(results, f_out, indent=1)
+
+def write_csv(results, filename):
+    fields = csv_fields
+    if any('latency' in result for result in results):
+        fields = csv_fields + csv_latency_fields
+    with open(filename, 'w', newline='') as f_out:
+        writer = csv.DictWriter(f_out, fieldnames=fields)
+        writer.writeheader()
+        for result in results:
+            writer.writerow(csv_row(result))
+
+if __name__ == '__main__':
+    '''
+    This script tests the robot in robot.py on every maze given as an
+    argument, once per seed, spreading the trials over all cores. With
+    --solution, each maze's minimum possible score is added through the
+    on-disk solution cache.
+    '''
+    parser = argparse.ArgumentParser(description='Test the robot on many mazes and seeds in parallel.')
+    parser.add_argument('mazes', nargs='+', help='maze files to test')
+    parser.add_argument('--seeds', type=int, default=1, help='number of seeds per maze, starting at 0')
+    parser.add_argument('--randomness', type=int, default=0, help='robot exploration randomness (0, 1 or 2)')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--deadline', type=float, help='milliseconds allowed for each next_move call')
+    parser.add_argument('--late', choices=late_policies, default='noop', help='what a late call does')
+    parser.add_argument('--plan-budget', type=int, help='most planning steps in one next_move call')
+    parser.add_argument('--plan-time', type=float, help='most milliseconds of planning in one next_move call')
+    parser.add_argument('--solution', action='store_true', help='add the minimum possible score (uses the solution cache)')
+    parser.add_argument('--json', help='write all results to this JSON file')
+    parser.add_argument('--csv', help='write one row per trial to this CSV file')
+    args = parser.parse_args()
+
+    deadline = None if args.deadline is None else args.deadline / 1e3
+    plan_time = None if args.plan_time is None else args.plan_time / 1e3
+    results = run_batch(args.mazes, range(args.seeds), args.randomness, args.workers, deadline, args.late,
+                        args.plan_budget, plan_time, args.solution)
+
+    if args.json:
+        write_json(results, args.json)
+    if args.csv:
+        write_csv(results, args.csv)
+
+    for result in results:
+        score = 'failed' if result['score'] is None else '{:4.3f}'.format(result['score'])
+        if result['min_score'] is None:
+            print('{} seed {}: {}'.format(result['maze'], result['seed'], score))
+        else:
+            print('{} seed {}: {} (minimum {:4.3f})'.format(result['maze'], result['seed'], score, result['min_score']))
+        if 'latency' in result:
+            print('  next_move latency: {}'.format(format_stats(result['latency'])))
+    wall_time = sum(result['wall_time'] for result in results)
+    print('{} trials, {:.2f} s of robot time'.format(len(results), wall_time))
@@ -0,0 +1,196 @@
+from maze import Maze
+from robot import Robot
+from tester import run_trial
+import numpy as np
+import argparse
+import contextlib
+import glob
+import json
+import os
+import random
+import time
+
+# branches of Robot.next_move that are timed separately
+branches = ['pre_goal', 'post_goal', 'reset', 'round_1']
+
+class TimedRobot(Robot):
+    '''
+    Robot that records the latency of every next_move call, keyed by the
+    branch the call went through: before the goal was first hit, after it
+    (including the steps that execute a planned detour), the call that ends
+    round 0 with a Reset (which plans the 2nd round), or in round 1.
+    '''
+    def __init__(self, maze_dim, latencies):
+        Robot.__init__(self, maze_dim)
+        self.latencies = latencies
+
+    def next_move(self, sensors):
+        round_before = self.round
+        start = time.perf_counter()
+        result = Robot.next_move(self, sensors)
+        elapsed = time.perf_counter() - start
+        if round_before == 1:
+            branch = 'round_1'
+        elif result == ('Reset', 'Reset'):
+            branch = 'reset'
+        elif self.hitgoal == 0:
+            branch = 'pre_goal'
+        else:
+            branch = 'post_goal'
+        self.latencies[branch].append(elapsed)
+        return result
+
+def summarize(samples):
+    '''
+    Latency summary in microseconds of a list of durations in seconds.
+    '''
+    if not samples:
+        return {'count': 0}
+    us = np.array(samples) * 1e6
+    return {'count': len(samples),
+            'mean_us': float(us.mean()),
+            'p50_us': float(np.percentile(us, 50)),
+            'p95_us': float(np.percentile(us, 95)),
+            'p99_us': float(np.percentile(us, 99))}
+
+def bench_next_move(mazes, repeats, seed):
+    latencies = dict((branch, []) for branch in branches)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for repeat in range(repeats):
+            for maze in mazes.values():
+                random.seed(seed)
+                run_trial(maze, lambda dim: TimedRobot(dim, latencies))
+    return dict((branch, summarize(latencies[branch])) for branch in branches)
+
+def bench_maze_init(filenames, repeats):
+    samples = []
+    for repeat in range(repeats):
+        for filename in filenames:
+            start = time.perf_counter()
+            Maze(filename)
+            samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def bench_dist_to_wall(mazes, repeats):
+    samples = []
+    for repeat in range(repeats):
+        for maze in mazes.values():
+            for x in range(maze.dim):
+                for y in range(maze.dim):
+                    for direction in ['u', 'r', 'd', 'l']:
+                        start = time.perf_counter()
+                        maze.dist_to_wall([x, y], direction)
+                        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def bench_trials(mazes, repeats, seed):
+    per_maze = {}
+    total_trials = 0
+    total_time = 0.0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for name, maze in mazes.items():
+            samples = []
+            for repeat in range(repeats):
+                random.seed(seed)
+                start = time.perf_counter()
+                result = run_trial(maze, Robot)
+                samples.append(time.perf_counter() - start)
+            summary = summarize(samples)
+            summary['score'] = result['score']
+            per_maze[name] = summary
+            total_trials += len(samples)
+            total_time += sum(samples)
+    return {'mazes': per_maze, 'trials_per_s': total_trials / total_time}
+
+def run_benchmarks(filenames, repeats=5, seed=0):
+    # results are keyed by file name, so that baselines compare across checkouts
+    names = [os.path.basename(filename) for filename in filenames]
+    for name in names:
+        if names.count(name) > 1:
+            raise Exception('Two mazes are named {}!'.format(name))
+    mazes = dict(zip(names, [Maze(filename) for filename in filenames]))
+    return {'seed': seed,
+            'repeats': repeats,
+            'next_move': bench_next_move(mazes, repeats, seed),
+            'maze_init': bench_maze_init(filenames, repeats),
+            'dist_to_wall': bench_dist_to_wall(mazes, repeats),
+            'trials': bench_trials(mazes, repeats, seed)}
+
+def flatten(results):
+    '''
+    The comparable numbers of a benchmark result as {name: value}; latencies
+    are lower-is-better, trials_per_s is higher-is-better.
+    '''
+    values = {}
+    for branch in branches:
+        for key in ['p50_us', 'p95_us', 'p99_us']:
+            if key in results['next_move'].get(branch, {}):
+                values['next_move.{}.{}'.format(branch, key)] = results['next_move'][branch][key]
+    for section in ['maze_init', 'dist_to_wall']:
+        for key in ['p50_us', 'p95_us', 'p99_us']:
+            values['{}.{}'.format(section, key)] = results[section][key]
+    values['trials.trials_per_s'] = results['trials']['trials_per_s']
+    return values
+
+def compare(results, baseline, tolerance):
+    '''
+    Prints every number next to its baseline and returns the names of those
+    that got worse by more than tolerance (a fraction).
+    '''
+    current = flatten(results)
+    previous = flatten(baseline)
+    regressions = []
+    for name in sorted(current):
+        if name not in previous or not previous[name]:
+            continue
+        ratio = current[name] / previous[name]
+        worse = ratio < 1 - tolerance if name.endswith('per_s') else ratio > 1 + tolerance
+        if worse:
+            regressions.append(name)
+        print('{:40s} {:12.2f} {:12.2f} {:7.2f}x{}'.format(name, previous[name], current[name], ratio, '  REGRESSION' if worse else ''))
+    return regressions
+
+def report(results):
+    for branch in branches:
+        summary = results['next_move'][branch]
+        if summary['count']:
+            print('next_move {:10s} n={:6d}  p50 {:9.1f} us  p95 {:9.1f} us  p99 {:9.1f} us'.format(
+                branch, summary['count'], summary['p50_us'], summary['p95_us'], summary['p99_us']))
+    for section in ['maze_init', 'dist_to_wall']:
+        summary = results[section]
+        print('{:20s} n={:6d}  p50 {:9.1f} us  p95 {:9.1f} us  p99 {:9.1f} us'.format(
+            section, summary['count'], summary['p50_us'], summary['p95_us'], summary['p99_us']))
+    for name, summary in sorted(results['trials']['mazes'].items()):
+        print('trial {:20s} p50 {:9.1f} us  score {}'.format(name, summary['p50_us'], summary['score']))
+    print('trials per second: {:.1f}'.format(results['trials']['trials_per_s']))
+
+if __name__ == '__main__':
+    '''
+    This script benchmarks the robot and maze code on the bundled mazes (or
+    the mazes given as arguments), and can save the results as a baseline
+    or compare them against a saved one.
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark robot.py and maze.py.')
+    parser.add_argument('mazes', nargs='*', help='maze files (default: bundled mazes)')
+    parser.add_argument('--repeats', type=int, default=5, help='repetitions of every measurement')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the robot randomness')
+    parser.add_argument('--save', help='save the results to this baseline file')
+    parser.add_argument('--compare', help='compare the results against this baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before a number counts as a regression')
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    filenames = args.mazes or sorted(glob.glob(os.path.join(here, 'Maze_*.txt')) + glob.glob(os.path.join(here, 'test_maze_*.txt')))
+    results = run_benchmarks(filenames, args.repeats, args.seed)
+    report(results)
+
+    if args.save:
+        with open(args.save, 'w') as f_out:
+            json.dump(results, f_out, indent=1)
+    if args.compare:
+        with open(args.compare) as f_in:
+            baseline = json.load(f_in)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('{} regressions'.format(len(regressions)))
+            raise SystemExit(1)
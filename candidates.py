@@ -0,0 +1,29 @@
+class CandidateRanker(object):
+    def __init__(self, order):
+        '''
+        Ranks candidate moves by a lexicographic priority. order is a tuple
+        with one entry per sort key: 1 sorts that key ascending, -1 sorts it
+        descending. Candidates that tie on every key keep the order in which
+        they were pushed, the same as a stable sort would.
+        '''
+        self.order = order
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    # add a candidate; keys follow the order given at construction
+    def push(self, keys, payload):
+        key = tuple(k * sign for k, sign in zip(keys, self.order))
+        # the insertion index breaks ties, so payloads are never compared
+        self.items.append((key, len(self.items), payload))
+
+    # payload of the candidate with the highest priority
+    def best(self):
+        if not self.items:
+            return None
+        return min(self.items)[2]
+
+    # payloads of all candidates, highest priority first
+    def ranked(self):
+        return [item[2] for item in sorted(self.items)]
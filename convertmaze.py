@@ -0,0 +1,17 @@
+from maze import Maze, write_maze, write_binary_maze
+import sys
+
+if __name__ == '__main__':
+    '''
+    This script converts a maze between the text and binary formats. The
+    input format is detected from the file; the output is binary if the
+    output file name ends in .mzb and text otherwise.
+    '''
+
+    # Load and validate the input maze.
+    testmaze = Maze( str(sys.argv[1]) )
+
+    if str(sys.argv[2]).endswith('.mzb'):
+        write_binary_maze(testmaze.walls, sys.argv[2])
+    else:
+        write_maze(testmaze.walls, sys.argv[2])
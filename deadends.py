@@ -0,0 +1,166 @@
+import numpy as np
+
+def settled_cells(knowledge):
+    # cells whose four sides are all known: sensed passages, or the outer wall
+    settled = np.ones(knowledge.deads.shape, dtype=bool)
+    settled[:-1, :] &= knowledge.knownv == 1
+    settled[1:, :] &= knowledge.knownv == 1
+    settled[:, :-1] &= knowledge.knownh == 1
+    settled[:, 1:] &= knowledge.knownh == 1
+    return settled
+
+def open_neighbors(knowledge, cells):
+    # cells joined to any of the given cells by a known open passage
+    openv = knowledge.wallv == 1
+    openh = knowledge.wallh == 1
+    result = np.zeros_like(cells)
+    result[1:, :] |= cells[:-1, :] & openv
+    result[:-1, :] |= cells[1:, :] & openv
+    result[:, 1:] |= cells[:, :-1] & openh
+    result[:, :-1] |= cells[:, 1:] & openh
+    return result
+
+def prune_dead_ends(knowledge, keep, candidates=None, inner=None):
+    '''
+    Marks cells as leading to a dead end (knowledge.deads = 2) as long as
+    there are cells that are not dead yet, have all four sides known and
+    at most one known open passage to a cell that is not dead, and are not
+    in the keep mask. Such a cell cannot lead anywhere that is not already
+    known. Cells in keep count as not dead, whatever deads says. Each pass
+    peels one cell off every dead corridor with array operations; only
+    candidates (all cells by default) and the neighbours of cells pruned in
+    the previous pass are looked at.
+
+    knowledge is a KnowledgeMap or a Window of one. Only cells in the inner
+    mask (all by default) are pruned; a window leaves out its edges that
+    are not edges of the maze, since their neighbours outside are not seen.
+    Returns the number of cells pruned and the mask of candidates that
+    were outside inner.
+    '''
+    shape = knowledge.deads.shape
+    if candidates is None:
+        candidates = np.ones(shape, dtype=bool)
+    if inner is None:
+        inner = np.ones(shape, dtype=bool)
+    settled = settled_cells(knowledge)
+    openv = knowledge.wallv == 1
+    openh = knowledge.wallh == 1
+    leftover = np.zeros(shape, dtype=bool)
+    pruned = 0
+    while True:
+        leftover |= candidates & ~inner
+        alive = (knowledge.deads == 0) | keep
+        prunable = candidates & inner & alive & settled & ~keep
+        if not prunable.any():
+            return pruned, leftover
+        degree = np.zeros(shape, dtype=np.int8)
+        degree[:-1, :] += openv & alive[1:, :]
+        degree[1:, :] += openv & alive[:-1, :]
+        degree[:, :-1] += openh & alive[:, 1:]
+        degree[:, 1:] += openh & alive[:, :-1]
+        prunable &= degree <= 1
+        if not prunable.any():
+            return pruned, leftover
+        knowledge.deads[prunable] = 2
+        pruned += int(np.count_nonzero(prunable))
+        candidates = open_neighbors(knowledge, prunable)
+
+class Window(object):
+    def __init__(self, knowledge, x0, x1, y0, y1):
+        '''
+        Dense copy (or view, for a dense map) of the cells [x0, x1) x [y0, y1)
+        of a knowledge map and the passages between them, with the same
+        attribute names, for prune_dead_ends. write_back() stores deads.
+        '''
+        self.knowledge = knowledge
+        self.x0, self.x1, self.y0, self.y1 = x0, x1, y0, y1
+        self.deads = np.array(knowledge.deads[x0:x1, y0:y1])
+        self.wallv = knowledge.wallv[x0:x1-1, y0:y1]
+        self.wallh = knowledge.wallh[x0:x1, y0:y1-1]
+        self.knownv = knowledge.knownv[x0:x1-1, y0:y1]
+        self.knownh = knowledge.knownh[x0:x1, y0:y1-1]
+
+    # mask of the cells whose four neighbours are all in the window or outside the maze
+    def inner(self):
+        inner = np.ones(self.deads.shape, dtype=bool)
+        if self.x0 > 0:
+            inner[0, :] = False
+        if self.x1 < self.knowledge.maze_dim:
+            inner[-1, :] = False
+        if self.y0 > 0:
+            inner[:, 0] = False
+        if self.y1 < self.knowledge.maze_dim:
+            inner[:, -1] = False
+        return inner
+
+    def write_back(self):
+        self.knowledge.deads[self.x0:self.x1, self.y0:self.y1] = self.deads
+
+class DeadEndPruner(object):
+    def __init__(self, knowledge, keep_cells):
+        '''
+        Keeps knowledge.deads up to date with prune_dead_ends as the robot
+        senses the maze. Each call to passage_known (or touch, for cells
+        marked dead elsewhere) only flags the cells around it; prune() then
+        re-examines those cells and whatever their pruning exposes, in a
+        window just large enough to hold them, so its cost does not grow
+        with the maze. keep_cells (the start and the goal area) and the cell
+        the robot is in (see hold) are never pruned and count as live, so the
+        pre-marked start does not eat its corridor and the robot always has a
+        live way out of a dead corridor it is in.
+        '''
+        self.map = knowledge
+        self.maze_dim = knowledge.maze_dim
+        self.keep = set((int(x), int(y)) for x, y in keep_cells)
+        self.held = None
+        self.dirty = set()
+
+    # flag the cells of a passage that became known in knownv / knownh. wall_type 'v' is
+    # the passage between (x, y) and (x+1, y); 'h' between (x, y) and (x, y+1)
+    def passage_known(self, wall_type, x, y):
+        if wall_type == 'v':
+            self.dirty.update([(x, y), (x + 1, y)])
+        else:
+            self.dirty.update([(x, y), (x, y + 1)])
+
+    # flag a cell whose dead end state changed, and its neighbours
+    def touch(self, x, y):
+        for cell in [(x, y), (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]:
+            if 0 <= cell[0] < self.maze_dim and 0 <= cell[1] < self.maze_dim:
+                self.dirty.add(cell)
+
+    # keep the robot's cell live; the cell it left is looked at again
+    def hold(self, x, y):
+        if self.held != (x, y):
+            if self.held is not None:
+                self.touch(*self.held)
+            self.held = (x, y)
+
+    def prune(self):
+        pruned = 0
+        while self.dirty:
+            cells = self.dirty
+            self.dirty = set()
+            xs = [cell[0] for cell in cells]
+            ys = [cell[1] for cell in cells]
+            # one more cell on every side, so the flagged cells see all their neighbours
+            x0, x1 = max(min(xs) - 1, 0), min(max(xs) + 2, self.maze_dim)
+            y0, y1 = max(min(ys) - 1, 0), min(max(ys) + 2, self.maze_dim)
+            window = Window(self.map, x0, x1, y0, y1)
+            candidates = np.zeros(window.deads.shape, dtype=bool)
+            keep = np.zeros(window.deads.shape, dtype=bool)
+            for x, y in cells:
+                candidates[x - x0, y - y0] = True
+            kept = set(self.keep)
+            if self.held is not None:
+                kept.add(self.held)
+            for x, y in kept:
+                if x0 <= x < x1 and y0 <= y < y1:
+                    keep[x - x0, y - y0] = True
+            count, leftover = prune_dead_ends(window, keep, candidates, window.inner())
+            if count:
+                window.write_back()
+                pruned += count
+            # pruning reached the window's edge: carry on in a window around those cells
+            self.dirty.update((int(x) + x0, int(y) + y0) for x, y in np.argwhere(leftover))
+        return pruned
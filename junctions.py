@@ -0,0 +1,250 @@
+import heapq
+import numpy as np
+
+# headings by index, the same as routeplanner: up, right, down, left
+heading_move = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+def step_heading(a, b):
+    return heading_move.index((b[0] - a[0], b[1] - a[1]))
+
+def sequence_runs(cells):
+    # straight runs of a cell sequence as (heading, number of cells moved)
+    runs = []
+    for a, b in zip(cells[:-1], cells[1:]):
+        h = step_heading(a, b)
+        if runs and runs[-1][0] == h:
+            runs[-1] = (h, runs[-1][1] + 1)
+        else:
+            runs.append((h, 1))
+    return runs
+
+def reverse_runs(runs):
+    return [((h + 2) % 4, length) for h, length in reversed(runs)]
+
+def follow_runs(h, spare, runs):
+    '''
+    Time steps needed to follow runs when the robot last moved along heading
+    h and could have moved spare (0 to 2) more cells in the same step. One
+    step moves up to three cells in a straight line. Returns the cost, the
+    last heading and the spare cells left after the last run.
+    '''
+    cost = 0
+    for run_h, length in runs:
+        if run_h != h:
+            h = run_h
+            spare = 0
+        if length <= spare:
+            spare -= length
+        else:
+            steps = -(-(length - spare) // 3)
+            cost += steps
+            spare = 3 * steps - (length - spare)
+    return cost, h, spare
+
+def route_waypoints(cells):
+    # the cells where each time step of following cells ends, as [x, y] lists
+    waypoints = []
+    h = -1
+    spare = 0
+    for a, b in zip(cells[:-1], cells[1:]):
+        step_h = step_heading(a, b)
+        if step_h == h and spare > 0:
+            spare -= 1
+            waypoints[-1] = [b[0], b[1]]
+        else:
+            h = step_h
+            spare = 2
+            waypoints.append([b[0], b[1]])
+    return waypoints
+
+class JunctionGraph(object):
+    def __init__(self, knowledge, keep_cells):
+        '''
+        Graph of the passages known to be open in which every corridor is
+        compressed into one edge. Nodes are the cells that do not have
+        exactly two known open sides (junctions and dead ends) and the
+        keep_cells (start and goal area); each edge is the chain of corridor
+        cells between two nodes, stored with its straight runs so that its
+        cost in time steps can be worked out.
+
+        passage_opened only flags the two cells of a new passage; update()
+        then drops the edges through those cells and traces them again from
+        their end nodes, so the graph follows the robot's knowledge at a cost
+        proportional to the corridors that changed.
+        '''
+        self.map = knowledge
+        self.maze_dim = knowledge.maze_dim
+        self.keep = set(tuple(cell) for cell in keep_cells)
+        self.is_node = knowledge.new_array((self.maze_dim, self.maze_dim), bool)
+        for cell in self.keep:
+            self.is_node[cell] = True
+        # edge id of every corridor cell, -1 for nodes and unknown cells
+        self.cell_edge = knowledge.new_array((self.maze_dim, self.maze_dim), np.int32, -1)
+        # edge id -> (cells from one end node to the other, straight runs)
+        self.edges = {}
+        # node -> {heading leaving the node: (edge id, whether cells start at the node)}
+        self.exits = dict((cell, {}) for cell in self.keep)
+        self.next_edge = 0
+        self.dirty = set()
+
+    # headings in which a cell has a known open passage
+    def open_headings(self, cell):
+        x, y = cell
+        result = []
+        if y < self.maze_dim - 1 and self.map.wallh[x, y] == 1:
+            result.append(0)
+        if x < self.maze_dim - 1 and self.map.wallv[x, y] == 1:
+            result.append(1)
+        if y > 0 and self.map.wallh[x, y - 1] == 1:
+            result.append(2)
+        if x > 0 and self.map.wallv[x - 1, y] == 1:
+            result.append(3)
+        return result
+
+    # wall_type 'v' is the passage between (x, y) and (x+1, y); 'h' between (x, y) and (x, y+1)
+    def passage_opened(self, wall_type, x, y):
+        self.dirty.add((x, y))
+        if wall_type == 'v':
+            self.dirty.add((x + 1, y))
+        else:
+            self.dirty.add((x, y + 1))
+
+    def remove_edge(self, edge_id):
+        cells, runs = self.edges.pop(edge_id)
+        for cell in cells[1:-1]:
+            self.cell_edge[cell] = -1
+        for end, heading in ((cells[0], runs[0][0]), (cells[-1], (runs[-1][0] + 2) % 4)):
+            exits = self.exits.get(end)
+            if exits is not None and exits.get(heading, (None,))[0] == edge_id:
+                del exits[heading]
+        return cells[0], cells[-1]
+
+    # follow the corridor leaving node in heading until the next node
+    def trace(self, node, heading):
+        cells = [node]
+        cell = node
+        while True:
+            dx, dy = heading_move[heading]
+            cell = (cell[0] + dx, cell[1] + dy)
+            cells.append(cell)
+            if self.is_node[cell] or len(cells) > self.maze_dim * self.maze_dim:
+                break
+            # a corridor cell has one other open side besides the way back
+            back = (heading + 2) % 4
+            heading = [h for h in self.open_headings(cell) if h != back][0]
+        edge_id = self.next_edge
+        self.next_edge += 1
+        runs = sequence_runs(cells)
+        self.edges[edge_id] = (cells, runs)
+        for corridor in cells[1:-1]:
+            self.cell_edge[corridor] = edge_id
+        self.exits[node][runs[0][0]] = (edge_id, True)
+        self.exits[cell][(runs[-1][0] + 2) % 4] = (edge_id, False)
+
+    def update(self):
+        if not self.dirty:
+            return
+        dirty = self.dirty
+        self.dirty = set()
+        # drop every edge through or ending at a changed cell
+        broken = set()
+        for cell in dirty:
+            if self.cell_edge[cell] >= 0:
+                broken.add(int(self.cell_edge[cell]))
+            for edge_id, forward in self.exits.get(cell, {}).values():
+                broken.add(edge_id)
+        starts = set(dirty)
+        for edge_id in broken:
+            starts.update(self.remove_edge(edge_id))
+        for cell in dirty:
+            node = cell in self.keep or len(self.open_headings(cell)) != 2
+            self.is_node[cell] = node
+            if node:
+                self.exits.setdefault(cell, {})
+            else:
+                self.exits.pop(cell, None)
+        # trace the corridors again from the nodes they were cut off at
+        for node in sorted(starts):
+            if not self.is_node[node]:
+                continue
+            for heading in self.open_headings(node):
+                if heading not in self.exits[node]:
+                    self.trace(node, heading)
+
+    # the ways out of a cell as sequences of cells, each ending at a node
+    def leaving(self, cell):
+        if self.is_node[cell]:
+            for edge_id, forward in self.exits[cell].values():
+                cells, runs = self.edges[edge_id]
+                if forward:
+                    yield cells, runs
+                else:
+                    yield cells[::-1], reverse_runs(runs)
+        elif self.cell_edge[cell] >= 0:
+            cells = self.edges[int(self.cell_edge[cell])][0]
+            i = cells.index(cell)
+            yield cells[i::-1], sequence_runs(cells[i::-1])
+            yield cells[i:], sequence_runs(cells[i:])
+
+    def route(self, source, target):
+        '''
+        Shortest route in time steps from source to target over the passages
+        known to be open, with moves of up to three cells in a straight line
+        as in the tester. Runs Dijkstra over (node, last heading, spare cells)
+        states, so a straight line through a junction costs the same as in
+        the cell grid. Returns the cells where each step ends, as [x, y]
+        lists, or None if target cannot be reached.
+        '''
+        self.update()
+        source = (int(source[0]), int(source[1]))
+        target = (int(target[0]), int(target[1]))
+        if source == target:
+            return []
+        # the sequences from the target's corridor ends into the target
+        into_target = {}
+        if not self.is_node[target]:
+            if self.cell_edge[target] < 0:
+                return None
+            for cells, runs in self.leaving(target):
+                into_target.setdefault(cells[-1], []).append(cells[::-1])
+
+        start_state = (source, -1, 0)
+        cost = {start_state: 0}
+        previous = {start_state: None}
+        heap = [(0, 0, start_state)]
+        count = 1
+        while heap:
+            state_cost, order, state = heapq.heappop(heap)
+            if state_cost > cost[state]:
+                continue
+            cell, h, spare = state
+            if cell == target:
+                cells = []
+                while previous[state] is not None:
+                    state, sequence = previous[state]
+                    cells = sequence[1:] + cells
+                return route_waypoints([source] + cells)
+            moves = list(self.leaving(cell))
+            for sequence in into_target.get(cell, []):
+                moves.append((sequence, sequence_runs(sequence)))
+            # source and target in the same corridor
+            if cell == source and not self.is_node[source] and self.cell_edge[source] == self.cell_edge[target]:
+                for sequence, runs in self.leaving(source):
+                    if target in sequence:
+                        sequence = sequence[:sequence.index(target) + 1]
+                        moves.append((sequence, sequence_runs(sequence)))
+            for sequence, runs in moves:
+                move_cost, new_h, new_spare = follow_runs(h, spare, runs)
+                new_state = (sequence[-1], new_h, new_spare)
+                new_cost = state_cost + move_cost
+                if new_state not in cost or new_cost < cost[new_state]:
+                    cost[new_state] = new_cost
+                    previous[new_state] = (state, sequence)
+                    heapq.heappush(heap, (new_cost, count, new_state))
+                    count += 1
+        return None
+
+    # number of nodes and edges, for comparing the graph with the cell grid
+    def size(self):
+        self.update()
+        return len(self.exits), len(self.edges)
@@ -0,0 +1,83 @@
+import numpy as np
+from tiles import TiledArray
+
+# the arrays with one entry per cell, as opposed to one per passage
+cell_arrays = ['visits', 'deads', 'G', 'G_updated', 'open_list', 'close_list', 'parents']
+
+class KnowledgeMap(object):
+    def __init__(self, maze_dim, tile_size=None):
+        '''
+        Everything the robot learns about the maze, stored as one small-dtype
+        NumPy array per attribute. All arrays are indexed [x, y], with x
+        increasing to the right and y increasing upwards, the same as robot
+        locations.
+        - visits: visit time of each cell
+        - deads: 1 is a dead end, 2 leads to a dead end, 0 is not
+        - wallv: passage between (x, y) and (x+1, y), 0 is wall; 1 is no wall
+        - wallh: passage between (x, y) and (x, y+1), 0 is wall; 1 is no wall
+        - knownv, knownh: 1 if the same passage was sensed (open or wall), 0 if
+          it is still unknown
+        - G, G_updated, open_list, close_list: A* bookkeeping of each cell
+        - parents: A* parent of each cell packed as x * maze_dim + y, -1 if none
+
+        With tile_size set, the arrays are tiles.TiledArray instead, which
+        only allocate the tile_size x tile_size chunks that are written to,
+        so that memory follows the explored part of very large mazes.
+        '''
+        self.maze_dim = maze_dim
+        self.tile_size = tile_size
+        self.visits = self.new_array((maze_dim, maze_dim), np.int32)
+        self.deads = self.new_array((maze_dim, maze_dim), np.uint8)
+        self.wallv = self.new_array((maze_dim-1, maze_dim), np.uint8)
+        self.wallh = self.new_array((maze_dim, maze_dim-1), np.uint8)
+        self.knownv = self.new_array((maze_dim-1, maze_dim), np.uint8)
+        self.knownh = self.new_array((maze_dim, maze_dim-1), np.uint8)
+        self.G = self.new_array((maze_dim, maze_dim), np.int32)
+        self.G_updated = self.new_array((maze_dim, maze_dim), np.uint8)
+        self.open_list = self.new_array((maze_dim, maze_dim), np.uint8)
+        self.close_list = self.new_array((maze_dim, maze_dim), np.uint8)
+        self.parents = self.new_array((maze_dim, maze_dim), np.int32, -1)
+
+    # an array of the map's kind (dense or tiled), for data kept alongside the map
+    def new_array(self, shape, dtype, fill=0):
+        if self.tile_size is None:
+            return np.full(shape, fill, dtype=dtype)
+        return TiledArray(shape, dtype, fill, self.tile_size)
+
+    # bytes held by all arrays of the map
+    def nbytes(self):
+        names = cell_arrays + ['wallv', 'wallh', 'knownv', 'knownh']
+        return sum(getattr(self, name).nbytes for name in names)
+
+    def cells_where(self, predicate, within):
+        '''
+        Cells (x, y) in row-major order where predicate(arrays) is True.
+        predicate gets an object with the per-cell arrays as attributes and
+        must return a boolean mask of the same shape, e.g.
+        lambda m: (m.open_list == 1) & (m.visits > 0). within names an array
+        whose fill value makes predicate False, so a tiled map only looks at
+        the tiles allocated in that array.
+        '''
+        if self.tile_size is None:
+            return [(int(x), int(y)) for x, y in np.argwhere(predicate(self))]
+        cells = []
+        for x0, x1, y0, y1 in getattr(self, within).tile_bounds():
+            view = TileView(dict((name, getattr(self, name)[x0:x1, y0:y1]) for name in cell_arrays))
+            cells += [(int(x) + x0, int(y) + y0) for x, y in np.argwhere(predicate(view))]
+        cells.sort()
+        return cells
+
+    # parent of a node as [x, y], [-1, -1] if it has none
+    def get_parent(self, node):
+        parent = int(self.parents[node[0], node[1]])
+        if parent < 0:
+            return [-1, -1]
+        return [parent // self.maze_dim, parent % self.maze_dim]
+
+    def set_parent(self, node, parent):
+        self.parents[node[0], node[1]] = parent[0] * self.maze_dim + parent[1]
+
+class TileView(object):
+    # the per-cell arrays of one tile as attributes, for KnowledgeMap.cells_where
+    def __init__(self, arrays):
+        self.__dict__.update(arrays)
@@ -0,0 +1,189 @@
+from tester import max_time, train_score_mult
+import numpy as np
+
+# headings in table order; turning right adds 1, turning left subtracts 1
+headings = ['u', 'r', 'd', 'l']
+heading_move = np.array([[0, 1], [1, 0], [0, -1], [-1, 0]])
+
+# actions a policy table can choose from, by index; the last one is a reset
+actions = [(rotation, movement) for rotation in (-90, 0, 90) for movement in range(-3, 4)]
+actions.append(('Reset', 'Reset'))
+reset_action = len(actions) - 1
+action_turn = np.array([rotation // 90 for rotation, movement in actions[:-1]] + [0])
+action_move = np.array([movement for rotation, movement in actions[:-1]] + [0])
+
+
+class TablePolicy(object):
+    def __init__(self, table):
+        '''
+        A robot policy given as a table of action indices (see actions),
+        indexed [run, x, y, heading] with the robot's own dead-reckoned
+        location and heading. Heading indices follow headings.
+        '''
+        self.table = np.asarray(table)
+        self.maze_dim = self.table.shape[1]
+
+    # actions for arrays of runs, locations and headings
+    def act(self, run, x, y, heading, sensing):
+        return self.table[run, x, y, heading]
+
+    @classmethod
+    def random(cls, maze_dim, seed=None, reset_prob=0.05):
+        rng = np.random.default_rng(seed)
+        table = rng.integers(0, reset_action, size=(2, maze_dim, maze_dim, 4))
+        table[rng.random(table.shape) < reset_prob] = reset_action
+        return cls(table)
+
+
+def advance_belief(maze_dim, run, x, y, heading, action):
+    '''
+    Updates a robot's dead-reckoned state after choosing the given actions:
+    rotations are applied, movements are assumed to succeed (clamped to the
+    maze), and a reset moves the robot to the start of the next run.
+    Works elementwise on arrays and returns the new (run, x, y, heading).
+    '''
+    heading = (heading + action_turn[action]) % 4
+    movement = action_move[action]
+    x = np.clip(x + heading_move[heading, 0] * movement, 0, maze_dim - 1)
+    y = np.clip(y + heading_move[heading, 1] * movement, 0, maze_dim - 1)
+    reset = action == reset_action
+    run = np.where(reset, np.minimum(run + 1, 1), run)
+    x = np.where(reset, 0, x)
+    y = np.where(reset, 0, y)
+    heading = np.where(reset, 0, heading)
+    return run, x, y, heading
+
+
+class PolicyRobot(object):
+    def __init__(self, maze_dim, policy):
+        '''
+        Drives a policy through the regular Robot interface, so that it can
+        be tested with tester.run_trial one trial at a time.
+        '''
+        self.maze_dim = maze_dim
+        self.policy = policy
+        self.state = (np.array([0]), np.array([0]), np.array([0]), np.array([0]))
+
+    def next_move(self, sensors):
+        run, x, y, heading = self.state
+        action = self.policy.act(run, x, y, heading, np.array([sensors]))
+        self.state = advance_belief(self.maze_dim, run, x, y, heading, action)
+        return actions[int(action[0])]
+
+
+class LockstepSimulator(object):
+    def __init__(self, mazes, policy):
+        '''
+        Runs N independent trials in lockstep, applying the sensing, movement
+        and scoring rules of tester.run_trial to all of them with array
+        operations. mazes holds one Maze per trial (all of the same
+        dimension); the same Maze object may be repeated. policy chooses the
+        actions of all trials at once (see TablePolicy).
+        '''
+        self.dim = mazes[0].dim
+        if any(maze.dim != self.dim for maze in mazes):
+            raise Exception('All mazes in a lockstep run must have the same dimension!')
+        unique = {}
+        for maze in mazes:
+            unique.setdefault(id(maze), (len(unique), maze))
+        self.maze_index = np.array([unique[id(maze)][0] for maze in mazes])
+        self.passable = np.stack([maze.passable for index, maze in unique.values()])
+        self.wall_dist = np.stack([maze.wall_dist for index, maze in unique.values()])
+        self.policy = policy
+        self.n = len(mazes)
+
+    def run(self):
+        '''
+        Simulates all trials to the end and returns one result dictionary per
+        trial, with the same keys as tester.run_trial apart from wall_time.
+        '''
+        n = self.n
+        dim = self.dim
+        trials = np.arange(n)
+        maze_index = self.maze_index
+        goal_bounds = [dim // 2 - 1, dim // 2]
+
+        # true position of every robot, and what each robot believes
+        x = np.zeros(n, dtype=int)
+        y = np.zeros(n, dtype=int)
+        heading = np.zeros(n, dtype=int)
+        belief = tuple(np.zeros(n, dtype=int) for part in range(4))
+
+        run = np.zeros(n, dtype=int)
+        total_time = np.zeros(n, dtype=int)
+        hit_goal = np.zeros((n, 2), dtype=bool)
+        runtimes = np.zeros((n, 2), dtype=int)
+        moves = np.zeros((n, 2), dtype=int)
+        done = np.zeros(n, dtype=bool)
+
+        while not done.all():
+            active = ~done
+            total_time[active] += 1
+            # end of time: the trial cannot finish any further run
+            timeout = active & (total_time > max_time)
+            done |= timeout
+            active &= ~timeout
+            if not active.any():
+                break
+            idx = trials[active]
+            run_idx = run[idx]
+            moves[idx, run_idx] += 1
+
+            # provide robots with sensor information, get actions
+            sensing = np.stack([self.wall_dist[maze_index[idx], (heading[idx] + turn) % 4, x[idx], y[idx]]
+                                for turn in (-1, 0, 1)], axis=1)
+            state = tuple(part[idx] for part in belief)
+            action = np.asarray(self.policy.act(*state, sensing))
+            new_belief = advance_belief(dim, *state, action)
+            for part, new_part in zip(belief, new_belief):
+                part[idx] = new_part
+
+            # resets end run 0 once the goal was hit, and are ignored otherwise
+            reset = action == reset_action
+            accepted = reset & (run_idx == 0) & hit_goal[idx, 0]
+            ended = idx[accepted]
+            runtimes[ended, 0] = total_time[ended]
+            run[ended] = 1
+            x[ended] = 0
+            y[ended] = 0
+            heading[ended] = 0
+
+            # perform rotation and movement of the trials that did not reset
+            idx = idx[~reset]
+            action = action[~reset]
+            heading[idx] = (heading[idx] + action_turn[action]) % 4
+            movement = action_move[action]
+            for square in range(3):
+                moving = movement != 0
+                if not moving.any():
+                    break
+                direction = np.where(movement > 0, heading[idx], (heading[idx] + 2) % 4)
+                free = moving & self.passable[maze_index[idx], direction, x[idx], y[idx]]
+                x[idx] += np.where(free, heading_move[direction, 0], 0)
+                y[idx] += np.where(free, heading_move[direction, 1], 0)
+                movement = np.where(free, movement - np.sign(movement), 0)
+
+            # check for goal entered
+            in_goal = np.isin(x[idx], goal_bounds) & np.isin(y[idx], goal_bounds)
+            hit_goal[idx[in_goal], run[idx[in_goal]]] = True
+            finished = idx[in_goal & (run[idx] == 1)]
+            runtimes[finished, 1] = total_time[finished] - runtimes[finished, 0]
+            done[finished] = True
+
+        results = []
+        for trial in range(n):
+            # like run_trial, hit_goal and moves have one entry per run started;
+            # run 1 is not started when run 0 used up the time
+            started = 2 if run[trial] == 1 and runtimes[trial, 0] < max_time else 1
+            completed = 2 if runtimes[trial, 1] else (1 if runtimes[trial, 0] else 0)
+            trial_runtimes = [int(t) for t in runtimes[trial, :completed]]
+            score = None
+            if completed == 2:
+                score = trial_runtimes[1] + train_score_mult*trial_runtimes[0]
+            results.append({'dim': dim,
+                            'runtimes': trial_runtimes,
+                            'score': score,
+                            'hit_goal': [bool(h) for h in hit_goal[trial, :started]],
+                            'total_time': int(min(total_time[trial], max_time)),
+                            'moves': [int(m) for m in moves[trial, :started]]})
+        return results
@@ -0,0 +1,129 @@
+from openlist import OpenList
+import numpy as np
+
+# cost of a node that cannot be reached (yet)
+INF = np.iinfo(np.int32).max // 2
+
+class LPAStar(object):
+    def __init__(self, knowledge, start=(0, 0)):
+        '''
+        Lifelong Planning A* over a robot's knowledge map. Keeps knowledge.G
+        equal to the exact cost of the cheapest route from start to every
+        cell over the passages known to be open, where one move goes up to
+        three cells in a straight line and costs 1, and knowledge.parents
+        equal to the previous cell on such a route. Unreachable cells have
+        G = INF and no parent.
+
+        Each call to passage_opened (or passage_closed) only marks the cells
+        around that passage as inconsistent; compute() then repairs G and
+        parents for the affected part of the map only.
+        '''
+        self.map = knowledge
+        self.maze_dim = knowledge.maze_dim
+        self.start = tuple(start)
+        self.g = knowledge.G
+        self.g[:] = INF
+        self.rhs = knowledge.new_array((self.maze_dim, self.maze_dim), np.int32, INF)
+        self.rhs[self.start] = 0
+        self.queue = OpenList(self.get_key)
+        self.queue.push(self.start)
+        # cells whose finite cost went down during the last compute()
+        self.decreased = []
+        self.compute()
+
+    # queue key of a locally inconsistent cell, None for consistent cells
+    def get_key(self, node):
+        g = int(self.g[node])
+        rhs = int(self.rhs[node])
+        if g == rhs:
+            return None
+        return (min(g, rhs), node[0] * self.maze_dim + node[1])
+
+    # cells one move away: up to three cells in each direction through known open passages
+    def neighbors(self, node):
+        x, y = node
+        wallv = self.map.wallv
+        wallh = self.map.wallh
+        result = []
+        for move in range(1, 4):
+            if y + move > self.maze_dim - 1 or wallh[x, y + move - 1] != 1:
+                break
+            result.append((x, y + move))
+        for move in range(1, 4):
+            if x + move > self.maze_dim - 1 or wallv[x + move - 1, y] != 1:
+                break
+            result.append((x + move, y))
+        for move in range(1, 4):
+            if y - move < 0 or wallh[x, y - move] != 1:
+                break
+            result.append((x, y - move))
+        for move in range(1, 4):
+            if x - move < 0 or wallv[x - move, y] != 1:
+                break
+            result.append((x - move, y))
+        return result
+
+    # recompute rhs and parent of a cell from its neighbours
+    def update_vertex(self, node):
+        if node != self.start:
+            best = INF
+            parent = None
+            for neighbor in self.neighbors(node):
+                cost = int(self.g[neighbor]) + 1
+                if cost < best:
+                    best = cost
+                    parent = neighbor
+            self.rhs[node] = min(best, INF)
+            if parent is None:
+                self.map.parents[node] = -1
+            else:
+                self.map.set_parent(node, parent)
+        self.queue.push(node)
+
+    # cells whose moves cross the passage between a and the next cell along axis
+    def affected_cells(self, wall_type, x, y):
+        cells = []
+        for offset in range(-2, 4):
+            if wall_type == 'v' and 0 <= x + offset < self.maze_dim:
+                cells.append((x + offset, y))
+            elif wall_type == 'h' and 0 <= y + offset < self.maze_dim:
+                cells.append((x, y + offset))
+        return cells
+
+    # wall_type 'v' is the passage between (x, y) and (x+1, y); 'h' between (x, y) and (x, y+1)
+    def passage_opened(self, wall_type, x, y):
+        if wall_type == 'v':
+            self.map.wallv[x, y] = 1
+        else:
+            self.map.wallh[x, y] = 1
+        for node in self.affected_cells(wall_type, x, y):
+            self.update_vertex(node)
+
+    def passage_closed(self, wall_type, x, y):
+        if wall_type == 'v':
+            self.map.wallv[x, y] = 0
+        else:
+            self.map.wallh[x, y] = 0
+        for node in self.affected_cells(wall_type, x, y):
+            self.update_vertex(node)
+
+    # make every cell consistent again; returns the number of cells expanded
+    def compute(self):
+        self.decreased = []
+        expanded = 0
+        node = self.queue.pop()
+        while node is not None:
+            expanded += 1
+            g = int(self.g[node])
+            rhs = int(self.rhs[node])
+            if g > rhs:
+                if g < INF:
+                    self.decreased.append(node)
+                self.g[node] = rhs
+            else:
+                self.g[node] = INF
+                self.update_vertex(node)
+            for neighbor in self.neighbors(node):
+                self.update_vertex(neighbor)
+            node = self.queue.pop()
+        return expanded
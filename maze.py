@@ -1,7 +1,110 @@
 import numpy as np
+import hashlib
+import struct
+
+# wall bit and lookup table index of each direction
+dir_bit = {'u': 1, 'r': 2, 'd': 4, 'l': 8,
+           'up': 1, 'right': 2, 'down': 4, 'left': 8}
+dir_index = {'u': 0, 'r': 1, 'd': 2, 'l': 3,
+             'up': 0, 'right': 1, 'down': 2, 'left': 3}
+
+# binary maze files: a 16 byte header (magic, little-endian uint32 dim, 8
+# reserved bytes) followed by the dim x dim uint8 wall grid in [x, y] order
+binary_magic = b'MZB1'
+binary_header = struct.Struct('<4sI8x')
+
+def is_binary_maze(filename):
+    with open(filename, 'rb') as f_in:
+        return f_in.read(len(binary_magic)) == binary_magic
+
+def load_binary_walls(filename):
+    """
+    Maps the wall grid of a binary maze file into memory without reading or
+    copying it; processes loading the same file share its pages. Returns
+    (dim, walls) with walls a read-only uint8 memmap.
+    """
+    with open(filename, 'rb') as f_in:
+        magic, dim = binary_header.unpack(f_in.read(binary_header.size))
+    if magic != binary_magic:
+        raise Exception('Not a binary maze file!')
+    walls = np.memmap(filename, dtype=np.uint8, mode='r',
+                      offset=binary_header.size, shape=(dim, dim))
+    return dim, walls
+
+def write_binary_maze(walls, filename):
+    walls = np.asarray(walls)
+    with open(filename, 'wb') as f_out:
+        f_out.write(binary_header.pack(binary_magic, walls.shape[0]))
+        f_out.write(np.ascontiguousarray(walls, dtype=np.uint8).tobytes())
+
+def write_maze(walls, filename):
+    """
+    Writes a wall array in the text maze format: the dimension on the first
+    line, then one line of comma separated wall values for each x.
+    """
+    walls = np.asarray(walls)
+    with open(filename, 'w') as f_out:
+        f_out.write('{}\n'.format(walls.shape[0]))
+        f_out.write('\n'.join(','.join(map(str, row)) for row in walls.tolist()))
+
+def run_lengths(passable, axis, reverse):
+    """
+    Returns, for every cell, the number of consecutive passable cells
+    starting at that cell and going along the given axis (towards lower
+    indices, or higher indices if reverse is set).
+    """
+    if reverse:
+        passable = np.flip(passable, axis)
+    count = np.cumsum(passable, axis=axis)
+    # running count at the last wall seen so far, subtracted to restart runs
+    reset = np.maximum.accumulate(np.where(passable, 0, count), axis=axis)
+    runs = count - reset
+    if reverse:
+        runs = np.flip(runs, axis)
+    return runs
+
+def lookup_tables(walls, dim):
+    """
+    Lookup tables so that sensing is constant time: whether each cell is
+    passable in each direction, and its distance to the nearest wall. A
+    passage leading out of the maze counts as one open cell. walls is an
+    [x, y] wall array, or a stack of them along leading axes. Returns
+    (passable, wall_dist), both with a direction axis in 'urdl' order just
+    before x and y.
+    """
+    passable = np.stack([walls & dir_bit[d] != 0 for d in 'urdl'], axis=-3)
+    wall_dist = np.stack([run_lengths(passable[..., 0, :, :], -1, True),
+                          run_lengths(passable[..., 1, :, :], -2, True),
+                          run_lengths(passable[..., 2, :, :], -1, False),
+                          run_lengths(passable[..., 3, :, :], -2, False)], axis=-3)
+    return passable, wall_dist.astype(np.min_scalar_type(dim))
+
+def find_wall_errors(walls):
+    """
+    Returns the inconsistent wall pairs of a wall array as a list of
+    [(x, y), 'v'] entries (wall between (x, y) and (x+1, y)) followed by
+    [(x, y), 'h'] entries (wall between (x, y) and (x, y+1)). Vertical
+    errors are ordered by x then y, horizontal errors by y then x.
+    """
+    walls = np.asarray(walls)
+    vertical = (walls[:-1, :] & 2 != 0) != (walls[1:, :] & 8 != 0)
+    horizontal = (walls[:, :-1] & 1 != 0) != (walls[:, 1:] & 4 != 0)
+    wall_errors = [[(int(x), int(y)), 'v'] for x, y in np.argwhere(vertical)]
+    wall_errors += [[(int(x), int(y)), 'h'] for y, x in np.argwhere(horizontal.T)]
+    return wall_errors
+
+def maze_hash(walls):
+    """
+    Content hash of a wall array: the same maze gives the same hex digest
+    whether it was read from a text or a binary file.
+    """
+    walls = np.ascontiguousarray(walls, dtype=np.uint8)
+    digest = hashlib.sha256(struct.pack('<I', walls.shape[0]))
+    digest.update(walls.tobytes())
+    return digest.hexdigest()
 
 class Maze(object):
-    def __init__(self, filename):
+    def __init__(self, filename=None, walls=None):
         '''
         Maze objects have two main attributes:
         - dim: mazes should be square, with sides of even length. (integer)
@@ -11,20 +114,31 @@ class Maze(object):
             4s register the bottom edge, and 8s register the left edge. (numpy
             array)
 
+        The maze is read from filename, either a text maze file or a binary
+        one (see write_binary_maze), which is memory-mapped instead of read.
+        When no filename is given, it is taken from a walls array (indexed
+        [x, y]).
+
         The initialization function also performs some consistency checks for
         wall positioning.
         '''
-        with open(filename, 'r') as f_in:
+        if filename is None:
+            self.walls = np.array(walls)
+            self.dim = self.walls.shape[0]
+        elif is_binary_maze(filename):
+            self.dim, self.walls = load_binary_walls(filename)
+        else:
+            with open(filename, 'r') as f_in:
 
-            # First line should be an integer with the maze dimensions
-            self.dim = int(next(f_in))
+                # First line should be an integer with the maze dimensions
+                self.dim = int(next(f_in))
 
-            # Subsequent lines describe the permissability of walls
-            walls = []
-            for line in f_in:
-                #walls.append(map(int,line.split(',')))
-                walls.append(list(map(int,line.split(','))))
-            self.walls = np.array(walls)
+                # Subsequent lines describe the permissability of walls
+                walls = []
+                for line in f_in:
+                    #walls.append(map(int,line.split(',')))
+                    walls.append(list(map(int,line.split(','))))
+                self.walls = np.array(walls)
 
         # Perform validation on maze
         # Maze dimensions
@@ -34,17 +148,7 @@ class Maze(object):
             raise Exception('Maze shape does not match dimension attribute!')
 
         # Wall permeability
-        wall_errors = []
-        # vertical walls
-        for x in range(self.dim-1):
-            for y in range(self.dim):
-                if (self.walls[x,y] & 2 != 0) != (self.walls[x+1,y] & 8 != 0):
-                    wall_errors.append([(x,y), 'v'])
-        # horizontal walls
-        for y in range(self.dim-1):
-            for x in range(self.dim):
-                if (self.walls[x,y] & 1 != 0) != (self.walls[x,y+1] & 4 != 0):
-                    wall_errors.append([(x,y), 'h'])
+        wall_errors = find_wall_errors(self.walls)
 
         if wall_errors:
             for cell, wall_type in wall_errors:
@@ -56,6 +160,9 @@ class Maze(object):
                     print('Inconsistent horizontal wall betweeen {} and {}'.format(cell, cell2))
             raise Exception('Consistency errors found in wall specifications!')
 
+        self.passable, self.wall_dist = lookup_tables(self.walls, self.dim)
+        self.hash = None
+
 
     def is_permissible(self, cell, direction):
         """
@@ -64,11 +171,9 @@ class Maze(object):
         input as single letter 'u', 'r', 'd', 'l', or complete words 'up', 
         'right', 'down', 'left'.
         """
-        dir_int = {'u': 1, 'r': 2, 'd': 4, 'l': 8,
-                   'up': 1, 'right': 2, 'down': 4, 'left': 8}
         try:
-            return (self.walls[tuple(cell)] & dir_int[direction] != 0)
-        except:
+            return bool(self.passable[dir_index[direction]][tuple(cell)])
+        except (KeyError, IndexError):
             print('Invalid direction provided!')
 
 
@@ -79,17 +184,17 @@ class Maze(object):
         may be input as a single letter 'u', 'r', 'd', 'l', or complete words
         'up', 'right', 'down', 'left'.
         """
-        dir_move = {'u': [0, 1], 'r': [1, 0], 'd': [0, -1], 'l': [-1, 0],
-                    'up': [0, 1], 'right': [1, 0], 'down': [0, -1], 'left': [-1, 0]}
-
-        sensing = True
-        distance = 0
-        curr_cell = list(cell) # make copy to preserve original
-        while sensing:
-            if self.is_permissible(curr_cell, direction):
-                distance += 1
-                curr_cell[0] += dir_move[direction][0]
-                curr_cell[1] += dir_move[direction][1]
-            else:
-                sensing = False
-        return distance
\ No newline at end of file
+        try:
+            return int(self.wall_dist[dir_index[direction]][tuple(cell)])
+        except (KeyError, IndexError):
+            print('Invalid direction provided!')
+            return 0
+
+
+    def content_hash(self):
+        """
+        Returns the content hash of the maze (see maze_hash), computed once.
+        """
+        if self.hash is None:
+            self.hash = maze_hash(self.walls)
+        return self.hash
@@ -0,0 +1,92 @@
+from maze import Maze, write_maze, write_binary_maze
+import numpy as np
+import argparse
+import random
+
+def generate_walls(dim, loops=0.0, seed=None):
+    '''
+    Generates a valid maze wall array (indexed [x, y], same 4-bit coding as
+    Maze.walls) of even dimension dim. A random depth-first spanning tree
+    connects every cell; then a fraction loops of the remaining interior
+    walls is removed to create alternative routes. The start square only
+    opens upwards and the four goal squares in the centre form one open
+    room.
+    '''
+    if dim % 2 or dim < 2:
+        raise Exception('Maze dimensions must be even in length!')
+    rng = random.Random(seed)
+
+    # open passages, indexed like the robot's wall lists:
+    # vertical[x, y] joins (x, y) and (x+1, y), horizontal[x, y] joins (x, y) and (x, y+1)
+    vertical = np.zeros((dim-1, dim), dtype=bool)
+    horizontal = np.zeros((dim, dim-1), dtype=bool)
+
+    # iterative randomized depth-first search over flat cell indices x * dim + y
+    visited = bytearray(dim * dim)
+    visited[0] = 1
+    stack = [0]
+    while stack:
+        cell = stack[-1]
+        x, y = divmod(cell, dim)
+        options = []
+        if y + 1 < dim and not visited[cell + 1]:
+            options.append((cell + 1, 'h', x, y))
+        if y > 0 and not visited[cell - 1]:
+            options.append((cell - 1, 'h', x, y - 1))
+        # the start square must not open to the right
+        if x + 1 < dim and not visited[cell + dim] and cell != 0:
+            options.append((cell + dim, 'v', x, y))
+        if x > 0 and not visited[cell - dim]:
+            options.append((cell - dim, 'v', x - 1, y))
+        if not options:
+            stack.pop()
+            continue
+        new_cell, wall_type, wx, wy = options[rng.randrange(len(options))]
+        if wall_type == 'v':
+            vertical[wx, wy] = True
+        else:
+            horizontal[wx, wy] = True
+        visited[new_cell] = 1
+        stack.append(new_cell)
+
+    # remove extra walls to create loops
+    if loops > 0:
+        np_rng = np.random.default_rng(rng.getrandbits(64))
+        vertical |= np_rng.random(vertical.shape) < loops
+        horizontal |= np_rng.random(horizontal.shape) < loops
+        vertical[0, 0] = False
+
+    # open the goal room
+    half = dim // 2
+    vertical[half-1, half-1:half+1] = True
+    horizontal[half-1:half+1, half-1] = True
+
+    walls = np.zeros((dim, dim), dtype=np.uint8)
+    walls[:, :-1] |= horizontal.astype(np.uint8) * 1
+    walls[:-1, :] |= vertical.astype(np.uint8) * 2
+    walls[:, 1:] |= horizontal.astype(np.uint8) * 4
+    walls[1:, :] |= vertical.astype(np.uint8) * 8
+    return walls
+
+def generate_maze(dim, loops=0.0, seed=None):
+    return Maze(walls=generate_walls(dim, loops, seed))
+
+if __name__ == '__main__':
+    '''
+    This script generates a random maze and writes it in the text maze format,
+    or in the binary format if the file name ends in .mzb.
+    '''
+    parser = argparse.ArgumentParser(description='Generate a random maze.')
+    parser.add_argument('dim', type=int, help='maze dimension (even)')
+    parser.add_argument('filename', help='output maze file')
+    parser.add_argument('--loops', type=float, default=0.0, help='fraction of extra walls to remove')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    args = parser.parse_args()
+
+    walls = generate_walls(args.dim, args.loops, args.seed)
+    if args.filename.endswith('.mzb'):
+        write_binary_maze(walls, args.filename)
+    else:
+        write_maze(walls, args.filename)
+    # validate what was written
+    Maze(args.filename)
@@ -0,0 +1,219 @@
+from maze import Maze
+from robot import Robot
+from routeplanner import route_cells
+from solutioncache import get_solution
+from stepprofile import StepProfiler
+from tester import run_trial
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import argparse
+import contextlib
+import functools
+import glob
+import os
+import struct
+import zlib
+
+# RGB colours of the rendering
+background_color = (255, 255, 255)
+wall_color = (0, 0, 0)
+path_color = (0, 90, 255)
+heat_color = (255, 60, 0)
+
+def wall_masks(walls):
+    '''
+    Splits a wall array (Maze.walls coding) into the wall segments to draw:
+    horizontal[x, gy] is the wall on grid line gy (0 to dim) above cell
+    column x, vertical[gx, y] the wall on grid line gx (0 to dim) beside
+    cell row y. Like showmaze, the top and right walls of every cell are
+    taken from that cell, the bottom row and left column give the rest.
+    '''
+    walls = np.asarray(walls)
+    dim = walls.shape[0]
+    horizontal = np.zeros((dim, dim + 1), dtype=bool)
+    vertical = np.zeros((dim + 1, dim), dtype=bool)
+    horizontal[:, 1:] = (walls & 1) == 0
+    horizontal[:, 0] = (walls[:, 0] & 4) == 0
+    vertical[1:, :] = (walls & 2) == 0
+    vertical[0, :] = (walls[0, :] & 8) == 0
+    return horizontal, vertical
+
+def render_image(walls, sq_size=20, path=None, visits=None):
+    '''
+    Draws a maze as an RGB image array of shape (dim*sq_size + 1,
+    dim*sq_size + 1, 3), with y pointing up like the maze coordinates.
+    visits, an optional (dim, dim) array indexed [x, y], shades every cell
+    by its count; path, an optional list of [x, y] cell locations, is drawn
+    as a line through the cell centres.
+    '''
+    walls = np.asarray(walls)
+    dim = walls.shape[0]
+    size = dim * sq_size + 1
+    image = np.empty((size, size, 3), dtype=np.uint8)
+    image[:] = background_color
+
+    if visits is not None:
+        visits = np.asarray(visits, dtype=float)
+        if visits.max() > 0:
+            # cell shade as an (x, y) array, flipped and scaled to image rows and columns
+            shade = np.repeat(np.repeat(visits[:, ::-1].T / visits.max(), sq_size, axis=0), sq_size, axis=1)
+            shade = shade[:, :, None]
+            cells = (1 - shade) * np.array(background_color) + shade * np.array(heat_color)
+            image[:-1, :-1] = cells.astype(np.uint8)
+
+    if path is not None and len(path) > 1:
+        points = np.asarray(path, dtype=float) * sq_size + sq_size / 2.
+        # sample every segment densely enough to leave no gaps
+        lines = []
+        for start, end in zip(points[:-1], points[1:]):
+            steps = int(np.abs(end - start).max()) + 1
+            lines.append(start + np.linspace(0, 1, steps)[:, None] * (end - start))
+        samples = np.rint(np.concatenate(lines)).astype(int)
+        cols = samples[:, 0]
+        rows = size - 1 - samples[:, 1]
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                image[np.clip(rows + d_row, 0, size - 1), np.clip(cols + d_col, 0, size - 1)] = path_color
+
+    horizontal, vertical = wall_masks(walls)
+    lines = np.zeros((size, size), dtype=bool)
+    # horizontal[x, gy] covers image columns x*sq_size to (x+1)*sq_size on row (dim-gy)*sq_size
+    segments = np.repeat(horizontal, sq_size, axis=0).T
+    rows = (dim - np.arange(dim + 1)) * sq_size
+    lines[rows, :-1] |= segments
+    lines[rows, 1:] |= segments
+    # vertical[gx, y] covers image rows (dim-y-1)*sq_size to (dim-y)*sq_size on column gx*sq_size
+    segments = np.repeat(vertical[:, ::-1], sq_size, axis=1).T
+    cols = np.arange(dim + 1) * sq_size
+    lines[:-1, cols] |= segments
+    lines[1:, cols] |= segments
+    # thicken the walls to two pixels
+    lines[1:, :] |= lines[:-1, :].copy()
+    lines[:, 1:] |= lines[:, :-1].copy()
+    image[lines] = wall_color
+    return image
+
+def render_svg(walls, sq_size=20, path=None, visits=None):
+    '''
+    The same drawing as render_image, as an SVG document string.
+    '''
+    walls = np.asarray(walls)
+    dim = walls.shape[0]
+    size = dim * sq_size
+    parts = ['<svg xmlns="http://www.w3.org/2000/svg" width="{0}" height="{0}" viewBox="-1 -1 {1} {1}">'.format(size + 2, size + 2),
+             '<rect x="-1" y="-1" width="{0}" height="{0}" fill="rgb{1}"/>'.format(size + 2, background_color)]
+
+    if visits is not None:
+        visits = np.asarray(visits, dtype=float)
+        if visits.max() > 0:
+            for x, y in np.argwhere(visits > 0):
+                parts.append('<rect x="{}" y="{}" width="{}" height="{}" fill="rgb{}" fill-opacity="{:.3f}"/>'.format(
+                    x * sq_size, (dim - 1 - y) * sq_size, sq_size, sq_size, heat_color, visits[x, y] / visits.max()))
+
+    if path is not None and len(path) > 1:
+        points = ' '.join('{},{}'.format(x * sq_size + sq_size / 2., (dim - y) * sq_size - sq_size / 2.) for x, y in path)
+        parts.append('<polyline points="{}" fill="none" stroke="rgb{}" stroke-width="3"/>'.format(points, path_color))
+
+    # walls are drawn last, on top of the overlays
+    horizontal, vertical = wall_masks(walls)
+    parts.append('<g stroke="rgb{}" stroke-width="2" stroke-linecap="square">'.format(wall_color))
+    for x, gy in np.argwhere(horizontal):
+        parts.append('<line x1="{}" y1="{}" x2="{}" y2="{}"/>'.format(
+            x * sq_size, (dim - gy) * sq_size, (x + 1) * sq_size, (dim - gy) * sq_size))
+    for gx, y in np.argwhere(vertical):
+        parts.append('<line x1="{}" y1="{}" x2="{}" y2="{}"/>'.format(
+            gx * sq_size, (dim - y) * sq_size, gx * sq_size, (dim - y - 1) * sq_size))
+    parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts) + '\n'
+
+def write_png(image, filename):
+    # minimal 8-bit RGB PNG writer, so that no imaging library is needed
+    height, width = image.shape[:2]
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    # every scanline starts with filter type 0
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8),
+                          np.ascontiguousarray(image, dtype=np.uint8).reshape(height, width * 3)], axis=1)
+    with open(filename, 'wb') as f_out:
+        f_out.write(b'\x89PNG\r\n\x1a\n')
+        f_out.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f_out.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)))
+        f_out.write(chunk(b'IEND', b''))
+
+def render_file(walls, filename, sq_size=20, path=None, visits=None):
+    '''
+    Writes the rendering as SVG if filename ends in .svg, as PNG otherwise.
+    '''
+    if filename.endswith('.svg'):
+        with open(filename, 'w') as f_out:
+            f_out.write(render_svg(walls, sq_size, path, visits))
+    else:
+        write_png(render_image(walls, sq_size, path, visits), filename)
+
+def trial_overlay(maze):
+    '''
+    Runs the robot in robot.py on maze and returns the locations it passed
+    through in its second run (the path) and how often it ended a step in
+    each cell during its first run (the visit heat map).
+    '''
+    path = [[0, 0]]
+    visits = np.zeros((maze.dim, maze.dim), dtype=int)
+    def record(step):
+        if step['run'] == 0:
+            visits[step['x'], step['y']] += 1
+        else:
+            path.append([step['x'], step['y']])
+    profiler = StepProfiler(callback=record, keep_trace=False)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        run_trial(maze, Robot, profiler=profiler)
+    return path, visits
+
+def render_job(filename, out_dir, image_format='png', sq_size=20, trial=False, oracle=False):
+    maze = Maze(filename)
+    path = visits = None
+    if trial:
+        path, visits = trial_overlay(maze)
+    elif oracle:
+        path = route_cells(get_solution(maze)['route'].tolist())
+    name = os.path.splitext(os.path.basename(filename))[0] + '.' + image_format
+    out_name = os.path.join(out_dir, name)
+    render_file(maze.walls, out_name, sq_size, path, visits)
+    return out_name
+
+def maze_files(inputs):
+    # maze files given directly, plus every maze file in the directories given
+    filenames = []
+    for name in inputs:
+        if os.path.isdir(name):
+            filenames += sorted(glob.glob(os.path.join(name, '*.txt')) + glob.glob(os.path.join(name, '*.mzb')))
+        else:
+            filenames.append(name)
+    return filenames
+
+if __name__ == '__main__':
+    '''
+    This script renders mazes to PNG or SVG images without a display,
+    spreading the mazes over all cores. Directories are searched for .txt
+    and .mzb maze files.
+    '''
+    parser = argparse.ArgumentParser(description='Render mazes to PNG or SVG images.')
+    parser.add_argument('mazes', nargs='+', help='maze files or directories of maze files')
+    parser.add_argument('--out', default='.', help='output directory')
+    parser.add_argument('--format', choices=['png', 'svg'], default='png', help='image format')
+    parser.add_argument('--size', type=int, default=20, help='square size in pixels')
+    overlay = parser.add_mutually_exclusive_group()
+    overlay.add_argument('--trial', action='store_true', help="overlay the robot's second run path and first run visits")
+    overlay.add_argument('--oracle', action='store_true', help='overlay the shortest route from the solution cache')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    args = parser.parse_args()
+
+    filenames = maze_files(args.mazes)
+    if not os.path.isdir(args.out):
+        os.makedirs(args.out)
+    job = functools.partial(render_job, out_dir=args.out, image_format=args.format,
+                            sq_size=args.size, trial=args.trial, oracle=args.oracle)
+    with ProcessPoolExecutor(max_workers=args.workers or os.cpu_count() or 1) as pool:
+        for out_name in pool.map(job, filenames):
+            print(out_name)
@@ -0,0 +1,120 @@
+from maze import Maze, is_binary_maze, load_binary_walls, lookup_tables, find_wall_errors
+import numpy as np
+import glob
+import os
+
+def maze_files(directory):
+    # the text and binary maze files of a directory, sorted by name
+    return sorted(glob.glob(os.path.join(directory, '*.txt')) + glob.glob(os.path.join(directory, '*.mzb')))
+
+def read_walls(filename):
+    '''
+    Reads the wall grid of a text or binary maze file without validating
+    it. Returns (dim, walls) with walls as an int64 array for text files,
+    which may hold any shape or values, and a uint8 memmap for binary ones.
+    '''
+    if is_binary_maze(filename):
+        return load_binary_walls(filename)
+    with open(filename, 'r') as f_in:
+        dim = int(next(f_in))
+        body = f_in.read()
+    lines = [line for line in body.splitlines() if line.strip()]
+    walls = np.fromstring(body.replace(',', ' '), dtype=np.int64, sep=' ')
+    # every line must have the same number of values to make up a grid
+    if len(lines) and walls.size % len(lines) == 0:
+        walls = walls.reshape(len(lines), -1)
+    return dim, walls
+
+class MazeSet(object):
+    def __init__(self, source):
+        '''
+        Many mazes held in one contiguous uint8 array, for batch work.
+        source is a directory (all its .txt and .mzb files, see maze_files)
+        or a list of maze file names. MazeSet objects have these attributes:
+        - filenames: the maze file of each index
+        - dims: dimension of each maze (numpy array)
+        - walls: wall grids indexed [maze, x, y], each maze in the corner
+          [:dim, :dim] and padded with walls up to the largest dimension
+        - passable, wall_dist: the sensing lookup tables (see
+          maze.lookup_tables) of all mazes, indexed [maze, direction, x, y]
+
+        The mazes are checked together with array operations, with the same
+        rules and errors as Maze. set[i] is a Maze view of maze i that can
+        be handed to tester, mazerender or lockstep code; its arrays are
+        views into the set.
+        '''
+        if isinstance(source, str):
+            source = maze_files(source)
+        self.filenames = list(source)
+        if not self.filenames:
+            raise Exception('No maze files to load!')
+        grids = [read_walls(filename) for filename in self.filenames]
+        self.dims = np.array([dim for dim, walls in grids])
+
+        # Maze dimensions
+        for filename, (dim, walls) in zip(self.filenames, grids):
+            if walls.shape != (dim, dim):
+                raise Exception('Maze shape does not match dimension attribute! ({})'.format(filename))
+        if (self.dims % 2).any():
+            raise Exception('Maze dimensions must be even in length! ({})'.format(
+                self.filenames[int(np.argmax(self.dims % 2))]))
+
+        size = int(self.dims.max())
+        self.walls = np.zeros((len(grids), size, size), dtype=np.uint8)
+        for i, (dim, walls) in enumerate(grids):
+            if walls.dtype != np.uint8 and ((walls < 0) | (walls > 15)).any():
+                raise Exception('Wall values must be between 0 and 15! ({})'.format(self.filenames[i]))
+            self.walls[i, :dim, :dim] = walls
+
+        # Wall permeability, over the whole stack; a pair is only compared
+        # when both cells are in the maze, not in its padding
+        coords = np.arange(size)
+        dims = self.dims[:, None, None]
+        inside_v = (coords[None, :-1, None] + 1 < dims) & (coords[None, None, :] < dims)
+        inside_h = (coords[None, :, None] < dims) & (coords[None, None, :-1] + 1 < dims)
+        vertical = (self.walls[:, :-1, :] & 2 != 0) != (self.walls[:, 1:, :] & 8 != 0)
+        horizontal = (self.walls[:, :, :-1] & 1 != 0) != (self.walls[:, :, 1:] & 4 != 0)
+        bad = (vertical & inside_v).any(axis=(1, 2)) | (horizontal & inside_h).any(axis=(1, 2))
+        if bad.any():
+            for i in np.flatnonzero(bad):
+                dim = self.dims[i]
+                for cell, wall_type in find_wall_errors(self.walls[i, :dim, :dim]):
+                    if wall_type == 'v':
+                        cell2 = (cell[0]+1, cell[1])
+                        print('{}: Inconsistent vertical wall betweeen {} and {}'.format(self.filenames[i], cell, cell2))
+                    else:
+                        cell2 = (cell[0], cell[1]+1)
+                        print('{}: Inconsistent horizontal wall betweeen {} and {}'.format(self.filenames[i], cell, cell2))
+            raise Exception('Consistency errors found in wall specifications!')
+
+        # the padding has no open passages, so runs stop at each maze's edge
+        # just as they do at the end of a single maze's array
+        self.passable, self.wall_dist = lookup_tables(self.walls, size)
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def __getitem__(self, i):
+        return MazeView(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    # indices of the mazes of one dimension, e.g. for a lockstep run
+    def with_dim(self, dim):
+        return np.flatnonzero(self.dims == dim)
+
+class MazeView(Maze):
+    def __init__(self, maze_set, i):
+        '''
+        Maze i of a MazeSet. It has the attributes and methods of a Maze,
+        with walls, passable and wall_dist as views into the set's arrays
+        rather than copies, and needs no further validation.
+        '''
+        self.filename = maze_set.filenames[i]
+        self.dim = int(maze_set.dims[i])
+        self.walls = maze_set.walls[i, :self.dim, :self.dim]
+        self.passable = maze_set.passable[i, :, :self.dim, :self.dim]
+        self.wall_dist = maze_set.wall_dist[i, :, :self.dim, :self.dim]
+        self.hash = None
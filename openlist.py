@@ -0,0 +1,44 @@
+import heapq
+
+class OpenList(object):
+    def __init__(self, key_func):
+        '''
+        Binary heap open list with lazy deletion. key_func(node) returns the
+        current priority key of a node, or None if the node should not be in
+        the open list. Whenever a node's key changes it is simply pushed
+        again; outdated entries are dropped when they reach the top of the
+        heap, because their stored key no longer matches key_func.
+        '''
+        self.key_func = key_func
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    # add a node, or refresh its entry after its key changed
+    def push(self, node):
+        key = self.key_func(node)
+        if key is not None:
+            heapq.heappush(self.heap, (key, node))
+
+    # recompute the keys of the given nodes and replace the heap with them,
+    # for changes that affect every key at once
+    def rebuild(self, nodes):
+        self.heap = []
+        for node in set(nodes):
+            key = self.key_func(node)
+            if key is not None:
+                self.heap.append((key, node))
+        heapq.heapify(self.heap)
+
+    # nodes currently held by the heap, including outdated entries
+    def nodes(self):
+        return [entry[1] for entry in self.heap]
+
+    # remove and return the node with the smallest current key, None if empty
+    def pop(self):
+        while self.heap:
+            key, node = heapq.heappop(self.heap)
+            if self.key_func(node) == key:
+                return node
+        return None
@@ -0,0 +1,123 @@
+import multiprocessing
+import numpy as np
+import time
+
+# what happens to a next_move call that misses its deadline: 'noop' - the
+# robot stands still in every time step until the action arrives; 'fail' -
+# the trial fails
+late_policies = ['noop', 'fail']
+
+def robot_worker(conn, robot_factory, maze_dim):
+    # serve next_move calls from the tester until told to stop
+    robot = robot_factory(maze_dim)
+    conn.send('ready')
+    while True:
+        sensors = conn.recv()
+        if sensors is None:
+            break
+        conn.send(robot.next_move(sensors))
+    conn.close()
+
+class RemoteRobot(object):
+    def __init__(self, robot_factory, maze_dim):
+        '''
+        Runs the robot made by robot_factory(maze_dim) in a worker process,
+        so the tester can stop waiting for a move when its deadline passes.
+        robot_factory must be picklable. call() times every next_move call
+        in wall-clock seconds as seen by the tester, including the time to
+        pass sensors and actions between the processes.
+        '''
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=robot_worker, args=(child_conn, robot_factory, maze_dim))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+        # the robot is set up before the first call's clock starts
+        self.receive()
+        self.latencies = []
+        self.late = 0
+        # calls that returned None while waiting for a late action
+        self.stalls = 0
+        # send time of the call whose action has not been received yet
+        self.pending = None
+        self.waits = 0
+        # the action of that call once received, and when it arrived
+        self.action = None
+        self.arrival = None
+
+    def receive(self):
+        try:
+            return self.conn.recv()
+        except EOFError:
+            raise Exception('Robot process exited, see its traceback above!')
+
+    def call(self, sensors, deadline):
+        '''
+        Passes sensors to the robot's next_move and waits up to deadline
+        seconds for its action. Returns the action, or None if it is not
+        there yet. While a call is late, further calls do not send new
+        sensors but wait up to deadline again for the same action, so the
+        robot sees every step in order and a late action is only delayed.
+        '''
+        step_start = time.perf_counter()
+        if self.pending is None:
+            self.pending = step_start
+            self.waits = 0
+            self.conn.send(sensors)
+        # poll() may wait a little longer than asked, so the arrival time decides
+        if self.action is None and self.conn.poll(deadline):
+            self.action = self.receive()
+            self.arrival = time.perf_counter()
+            self.latencies.append(self.arrival - self.pending)
+        if self.action is not None and self.arrival <= step_start + deadline:
+            action = self.action
+            self.action = None
+            self.pending = None
+            return action
+        if self.waits == 0:
+            self.late += 1
+        self.waits += 1
+        self.stalls += 1
+        return None
+
+    def close(self):
+        if self.process.is_alive():
+            try:
+                if self.pending is not None and self.action is None:
+                    self.receive()
+                self.conn.send(None)
+            except (Exception, OSError):
+                pass
+            self.process.join(1.0)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.conn.close()
+
+    def stats(self):
+        stats = latency_stats(self.latencies, self.late)
+        stats['stalls'] = self.stalls
+        return stats
+
+def latency_stats(latencies, late=0):
+    '''
+    Summary of next_move latencies given in seconds: number of calls and of
+    late calls, and the mean, 50th, 95th, 99th percentile and maximum
+    latency in milliseconds.
+    '''
+    ms = np.array(latencies) * 1e3
+    if not len(ms):
+        return {'count': 0, 'late': late}
+    return {'count': len(ms),
+            'late': late,
+            'mean_ms': float(ms.mean()),
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)),
+            'p99_ms': float(np.percentile(ms, 99)),
+            'max_ms': float(ms.max())}
+
+def format_stats(stats):
+    if not stats['count']:
+        return 'no next_move calls'
+    return '{} calls, {} late, {} stalled steps, mean {:.3f} ms, p50 {:.3f} ms, p95 {:.3f} ms, p99 {:.3f} ms, max {:.3f} ms'.format(
+        stats['count'], stats['late'], stats['stalls'], stats['mean_ms'], stats['p50_ms'],
+        stats['p95_ms'], stats['p99_ms'], stats['max_ms'])
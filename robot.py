@@ -1,7 +1,14 @@
 import numpy as np
 import copy
-import pandas as pd
 import random
+import time
+from candidates import CandidateRanker
+from openlist import OpenList
+from knowledge import KnowledgeMap
+from lpastar import LPAStar
+from deadends import DeadEndPruner, Window, settled_cells
+from junctions import JunctionGraph
+from routeplanner import plan_route, headings, CostToGo, cell_distances
 
 # global dictionaries for robot movement and sensing
 dir_sensors = {'u': ['l', 'u', 'r'], 'r': ['u', 'r', 'd'],
@@ -13,13 +20,40 @@ dir_move = {'u': [0, 1], 'r': [1, 0], 'd': [0, -1], 'l': [-1, 0],
 dir_reverse = {'u': 'd', 'r': 'l', 'd': 'u', 'l': 'r',
                'up': 'd', 'right': 'l', 'down': 'u', 'left': 'r'}
 
+# mazes at least this large keep the knowledge map in tiles of map_tile_size cells
+tiled_dim = 256
+map_tile_size = 32
+
+# knowledge map arrays kept in a snapshot of the 1st round
+snapshot_arrays = ['visits', 'deads', 'wallv', 'wallh', 'knownv', 'knownh',
+                   'G', 'G_updated', 'open_list', 'close_list', 'parents']
+
 class Robot(object):
-    def __init__(self, maze_dim):
+    def __init__(self, maze_dim, randomness=0, random_window=25, reset_steps=900,
+                 astar_num=6, gain_factor=30, explore_value=30, prune_corridors=0,
+                 plan_budget=None, plan_time=None):
         '''
         Use the initialization function to set up attributes that your robot
         will use to learn and navigate the maze. Some initial attributes are
         provided based on common information, including the size of the maze
         the robot is placed in.
+
+        The other arguments are the exploration knobs: randomness of the
+        choice between ranked neighbours (0, 1 or 2) and for how many steps
+        per maze_dim it is used (random_window); the step count after which
+        the 1st round is stopped once the goal was hit (reset_steps); and the
+        stop rule after the goal is hit, which ends the 1st round when the
+        steps of the last astar_num - 1 detours outweigh the path length they
+        saved times gain_factor. explore_value is how many 1st round steps one
+        2nd round step is worth to the bounded stop (see exploration_bounds);
+        0 turns that stop off. prune_corridors 1 marks whole corridors that
+        only lead to dead ends as dead (see deadends.DeadEndPruner); 0, the
+        default, only marks the dead ends sensed on the spot.
+
+        plan_budget and plan_time make planning anytime: at most that many
+        planning steps (open nodes expanded by update_visited, or levels of
+        the 2nd round cost-to-go field) and seconds spent planning in one
+        call, the rest being done in later calls. None is no limit.
         '''
         self.location = [0, 0]
         self.heading = 'up'
@@ -33,31 +67,21 @@ class Robot(object):
         self.hitgoal = 0
         self.round = 0
         
-        # visit time of each cell
-        self.visits = [[0 for i in range(self.maze_dim)] for j in range(self.maze_dim)]
-        self.visits[maze_dim-1][0] = 100
-        
-        # whether a cell is a dead end or leads to a dead end, 1 is dead, 2 will lead to a dead end ,0 is not
-        self.deads = [[0 for i in range(self.maze_dim)] for j in range(self.maze_dim)]
-        self.deads[maze_dim-1][0] = 1
-        self.deads[maze_dim-2][0] = 2
-        
-        # list of vertical walls, 0 is wall; 1 is no wall, can pass through
-        self.wallv = [[0 for i in range(self.maze_dim-1)] for j in range(self.maze_dim)]
-        # list of horizontal walls
-        self.wallh = [[0 for i in range(self.maze_dim)] for j in range(self.maze_dim-1)]
-        
-        # indicate A* G value of each node
-        self.G = [[0 for i in range(self.maze_dim)] for j in range(self.maze_dim)]
-        # whether A* G value is updated. If yes, its neighbors' G value may be also updated, whose neighbors will have a chain effect
-        self.G_updated = [[0 for i in range(self.maze_dim)] for j in range(self.maze_dim)]
-        
-        # the A* open and close list of node
-        self.close_list = [[0 for i in range(self.maze_dim)] for j in range(self.maze_dim)]
-        self.open_list = [[0 for i in range(self.maze_dim)] for j in range(self.maze_dim)]
-        
-        # indicate the parent node of a node
-        self.parents = [[[-1, -1] for i in range(self.maze_dim)] for j in range(self.maze_dim)]
+        # what the robot knows about the maze: visit time of each cell, dead ends,
+        # walls, A* G values, open and close lists and parents, indexed [x, y]
+        self.map = KnowledgeMap(self.maze_dim, map_tile_size if self.maze_dim >= tiled_dim else None)
+        self.map.visits[0, 0] = 100
+        self.map.deads[0, 0] = 1
+        self.map.deads[0, 1] = 2
+        # keeps the A* G values and parents in the map exact as walls are discovered
+        self.planner = LPAStar(self.map)
+        # marks whole dead corridors once their walls are known, never the start (both cells
+        # pre-marked dead above) or the goal area; None when prune_corridors is off
+        self.pruner = None
+        if prune_corridors:
+            self.pruner = DeadEndPruner(self.map, [[0, 0], [0, 1]] + [[int(gx), int(gy)] for gx in self.goal_bounds for gy in self.goal_bounds])
+        # known corridors compressed between junctions, for shortest routes across the map
+        self.junctions = JunctionGraph(self.map, [(0, 0)] + [(int(gx), int(gy)) for gx in self.goal_bounds for gy in self.goal_bounds])
         
         # destination point
         self.x_end = -1
@@ -65,8 +89,10 @@ class Robot(object):
         # for calculate A* H value, which is more accurate than (x_end, y_end)
         self.x_end_0 = -1
         self.y_end_0 = -1
-        # path from start point to the destination
+        # path from start point to the destination, and the position of each node on it (-1 if not on it)
         self.path = []
+        self.path_index = self.map.new_array((self.maze_dim, self.maze_dim), np.int32, -1)
+        self.indexed_path = []
         
         #lists to record A* Search cost and gain (path length)
         self.astarcost = [0]
@@ -74,13 +100,33 @@ class Robot(object):
         
         # path to execute when we need the robot to go to a specific location,
         self.pathexe = []
+        # actions (rotation, movement) of the fastest known route, for the 2nd round
+        self.route = None
+        # 2nd round cost-to-go field, built over several calls when planning is budgeted
+        self.cost_to_go = None
         # whether to continue previous unfinished execution path
         self.contd = 0
+        # snapshot of what was learned in the 1st round, taken on reset
+        self.explored = None
+        # passages sensed so far as walls and as open, and the exploration bounds cached
+        # with the counts they depend on (see exploration_bounds)
+        self.sensed = [0, 0]
+        self.upper_bound = None
+        self.optimistic = None
+        self.bounds = None
         
         #for test
         self.step1 = 0
         #test 0:no randomness; 1:less randomness; 2:more randomness
-        self.randomness = 0
+        self.randomness = randomness
+        self.random_window = random_window
+        self.reset_steps = reset_steps
+        self.astar_num = astar_num
+        self.gain_factor = gain_factor
+        self.explore_value = explore_value
+        self.prune_corridors = prune_corridors
+        self.plan_budget = plan_budget
+        self.plan_time = plan_time
         
     # A* H value of given (x,y) before hitting goal
     def get_H1(self, x, y):
@@ -99,7 +145,7 @@ class Robot(object):
             return False
         
     def get_parent(self, node):
-        return self.parents[self.maze_dim-node[1]-1][node[0]]
+        return self.map.get_parent(node)
     
     # check whether robot can go to the destination node directly, if yes, return rotation and movement
     def check_pass(self, dest):
@@ -129,7 +175,7 @@ class Robot(object):
                         x_h = int(x)
                         y_h = int(y - 0.5 + (move - 0.5) * direction[1])
                         if y_h >= 0 and y_h <= self.maze_dim - 2:
-                            if self.wallh[self.maze_dim-y_h-2][x_h] == 1:
+                            if self.map.wallh[x_h, y_h] == 1:
                                 movement = move
                             else:
                                 break
@@ -140,7 +186,7 @@ class Robot(object):
                         x_v = int(x - 0.5 + (move - 0.5) * direction[0])
                         y_v = int(y)
                         if x_v >= 0 and x_v <= self.maze_dim - 2:
-                            if self.wallv[self.maze_dim-y_v-2][x_v] == 1:
+                            if self.map.wallv[x_v, y_v] == 1:
                                 movement = move
                             else:
                                 break
@@ -169,7 +215,7 @@ class Robot(object):
                 x_h = int(x)
                 y_h = int(y - 0.5 - (i - 0.5) * direction[1])
                 if y_h >= 0 and y_h <= self.maze_dim - 2:
-                    if self.wallh[self.maze_dim-y_h-2][x_h] == 1:
+                    if self.map.wallh[x_h, y_h] == 1:
                         sensor_back = i
                     else:
                         break
@@ -178,7 +224,7 @@ class Robot(object):
                 x_v = int(x - 0.5 - (i - 0.5) * direction[0])
                 y_v = int(y)
                 if x_v >= 0 and x_v <= self.maze_dim -2:
-                    if self.wallv[self.maze_dim-y_v-2][x_v] == 1:
+                    if self.map.wallv[x_v, y_v] == 1:
                         sensor_back = i
                     else:
                         break
@@ -189,28 +235,45 @@ class Robot(object):
         x = self.location[0]
         y = self.location[1]
         for i in range(3):
-            if sensors[i] > 0:
-                direction = self.heading
-                if i == 0:
-                    direction = dir_sensors[self.heading][0]
-                if i == 1:
-                    direction = dir_sensors[self.heading][1]
-                elif i == 2:
-                    direction = dir_sensors[self.heading][2]
-                direction = dir_move[direction]
-                for move in range(1, sensors[i] + 1):
-                    #horizontal
-                    if direction[0] == 0:
-                        x_h = int(x)
-                        y_h = int(y - 0.5 + (move - 0.5) * direction[1])
-                        if y_h >= 0 and y_h <= self.maze_dim -2:
-                            self.wallh[self.maze_dim-y_h-2][x_h] = 1
-                    #vertical
-                    elif direction[1] == 0:
-                        x_v = int(x - 0.5 + (move - 0.5) * direction[0])
-                        y_v = int(y)
-                        if x_v >= 0 and x_v <= self.maze_dim - 2:
-                             self.wallv[self.maze_dim-y_v-2][x_v] = 1
+            direction = dir_move[dir_sensors[self.heading][i]]
+            # passages up to the sensed distance are open, the one after them is a wall
+            for move in range(1, sensors[i] + 2):
+                #horizontal
+                if direction[0] == 0:
+                    x_h = int(x)
+                    y_h = int(y - 0.5 + (move - 0.5) * direction[1])
+                    if y_h >= 0 and y_h <= self.maze_dim -2:
+                        if move <= sensors[i] and self.map.wallh[x_h, y_h] == 0:
+                            self.planner.passage_opened('h', x_h, y_h)
+                            self.junctions.passage_opened('h', x_h, y_h)
+                        if self.map.knownh[x_h, y_h] == 0:
+                            self.map.knownh[x_h, y_h] = 1
+                            self.sensed[move <= sensors[i]] += 1
+                            if self.pruner is not None:
+                                self.pruner.passage_known('h', x_h, y_h)
+                #vertical
+                elif direction[1] == 0:
+                    x_v = int(x - 0.5 + (move - 0.5) * direction[0])
+                    y_v = int(y)
+                    if x_v >= 0 and x_v <= self.maze_dim - 2:
+                        if move <= sensors[i] and self.map.wallv[x_v, y_v] == 0:
+                            self.planner.passage_opened('v', x_v, y_v)
+                            self.junctions.passage_opened('v', x_v, y_v)
+                        if self.map.knownv[x_v, y_v] == 0:
+                            self.map.knownv[x_v, y_v] = 1
+                            self.sensed[move <= sensors[i]] += 1
+                            if self.pruner is not None:
+                                self.pruner.passage_known('v', x_v, y_v)
+
+    # repair G values and parents after new walls were found. A closed node whose G value
+    # improved is moved back to the open list, since it may now lead somewhere cheaper
+    def update_costs(self):
+        self.planner.compute()
+        for node in self.planner.decreased:
+            self.map.G_updated[node] = 1
+            if self.map.close_list[node] == 1:
+                self.map.close_list[node] = 0
+                self.map.open_list[node] = 1
         
     def exe_path(self, sensors):
         next_pos = self.pathexe[0]
@@ -239,116 +302,143 @@ class Robot(object):
             curr_loc = self.get_parent(curr_loc)
         self.path.append([0,0])
         self.path.reverse()
+        self.index_path()
 
+    # record the position of every node on the path (a branch of the parent tree, so no node
+    # appears twice). Only the part after the start it shares with the path indexed before is
+    # rewritten, so the cost follows the change rather than the maze size
+    def index_path(self):
+        old = self.indexed_path
+        same = 0
+        while same < len(old) and same < len(self.path) and old[same] == self.path[same]:
+            same += 1
+        for x, y in old[same:]:
+            self.path_index[x, y] = -1
+        for i in range(same, len(self.path)):
+            self.path_index[self.path[i][0], self.path[i][1]] = i
+        self.indexed_path = list(self.path)
+
+    # nodes from node up the parent tree until the path is reached, and the position where it is
+    # reached; (None, -1) if a node without a parent is reached first
+    def climb_to_path(self, node):
+        chain = []
+        while self.path_index[node[0], node[1]] < 0:
+            chain.append(node)
+            node = self.get_parent(node)
+            if node[0] < 0:
+                return None, -1
+        return chain, int(self.path_index[node[0], node[1]])
+
+    # open list key of a node for update_visited, None if the node is not eligible:
+    # 1. small F_value; 2. updated G value comes first; 3. less visit time; 4. scan order
+    def get_visited_key(self, node):
+        i, j = node
+        visit = int(self.map.visits[i, j])
+        if self.map.open_list[i, j] == 1 and visit > 0:
+            if (not self.check_hitgoal([i,j])) or (i == self.x_end and j == self.y_end):
+                G_updated = int(self.map.G_updated[i, j])
+                F_value = int(self.map.G[i, j]) + self.get_H2(i,j)
+                return (F_value, -G_updated, visit, i * self.maze_dim + j)
+        return None
+
+    # expand the visited open nodes, best first, within plan_budget and plan_time. Nodes left
+    # over stay in the open list, so the next call carries on where this one stopped.
+    # Returns the number of nodes expanded
     def update_visited(self):
-        i_update = 1
-        while i_update == 1:
-            i_update == 0
-            df = pd.DataFrame(columns=['x', 'y', 'F_value', 'visit', 'G_updated'])
-            for i in range(self.maze_dim):
-                for j in range(self.maze_dim):
-                    visit = self.visits[self.maze_dim-j-1][i]
-                    if self.open_list[self.maze_dim-j-1][i] == 1 and visit > 0:
-                        if (not self.check_hitgoal([i,j])) or (i == self.x_end and j == self.y_end):
-                            G_updated = self.G_updated[self.maze_dim-j-1][i]
-                            G_value = self.G[self.maze_dim-j-1][i]
-                            F_value = G_value + self.get_H2(i,j)
-                            df = df.append({'x':i, 'y':j, 'F_value':F_value, 'visit': visit, 'G_updated': G_updated}, ignore_index=True)
-            if df.shape[0] > 0:
-                i_update = 1
-                df = df.sort_values(['F_value', 'G_updated', 'visit'], ascending=[True, False, True], ignore_index=True)
-                x = int(df.reset_index()['x'].iloc[0])
-                y = int(df.reset_index()['y'].iloc[0])
-                
-                for direction in [[0, 1], [1, 0], [0, -1], [-1, 0]]:
-                    for move in range (1, 4):
-                        x_new = x + move * direction[0]
-                        y_new = y + move * direction[1]
-                        if x_new >= 0 and x_new <= self.maze_dim - 1 and y_new >= 0 and y_new <= self.maze_dim - 1:
-                            #check horizontal wall
-                            if direction[0] == 0:
-                                x_h = int(x)
-                                y_h = int(y - 0.5 + (move - 0.5) * direction[1])
-                                if y_h >= 0 and y_h <= self.maze_dim - 2:
-                                    if self.wallh[self.maze_dim-y_h-2][x_h] == 1:
-                                        if self.deads[self.maze_dim-y_new-1][x_new] == 0:
-                                            Original_G = self.G[self.maze_dim-y_new-1][x_new]
-                                            new_G = self.G[self.maze_dim-y-1][x] + 1
-                                            # if exists in close list
-                                            if self.close_list[self.maze_dim-y_new-1][x_new] == 1:
-                                                if Original_G > new_G:
-                                                    self.close_list[self.maze_dim-y_new-1][x_new] = 0
-                                                    self.open_list[self.maze_dim-y_new-1][x_new] = 1
-                                                    self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                                    self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                                    self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                                    self.G_updated[self.maze_dim-y_new-1][x_new] = 1
-                                            else:
-                                                # if not exists in open list, add it to open list
-                                                if self.open_list[self.maze_dim-y_new-1][x_new] == 0:
-                                                    self.open_list[self.maze_dim-y_new-1][x_new] = 1
-                                                    self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                                    self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                                    self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                                # if exists in open list and the G value in open list is larger, then update its value and parent
-                                                elif Original_G > new_G:
-                                                    self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                                    self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                                    self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                                    self.G_updated[self.maze_dim-y_new-1][x_new] = 1
-                                        else:
-                                            break
-                                    else:
-                                        break
-                                else:
-                                    break
-                            #check vertical wall
-                            elif direction[1] == 0:
-                                x_v = int(x - 0.5 + (move - 0.5) * direction[0])
-                                y_v = int(y)
-                                if x_v >= 0 and x_v <= self.maze_dim - 2:
-                                    if self.wallv[self.maze_dim-y_v-2][x_v] == 1:
-                                        if self.deads[self.maze_dim-y_new-1][x_new] == 0:
-                                            Original_G = self.G[self.maze_dim-y_new-1][x_new]
-                                            new_G = self.G[self.maze_dim-y-1][x] + 1
-                                            # if exists in close list
-                                            if self.close_list[self.maze_dim-y_new-1][x_new] == 1:
-                                                if Original_G > new_G:
-                                                    self.close_list[self.maze_dim-y_new-1][x_new] = 0
-                                                    self.open_list[self.maze_dim-y_new-1][x_new] = 1
-                                                    self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                                    self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                                    self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                                    self.G_updated[self.maze_dim-y_new-1][x_new] = 1
-                                            else:
-                                                # if not exists in open list, add it to open list
-                                                if self.open_list[self.maze_dim-y_new-1][x_new] == 0:
-                                                    self.open_list[self.maze_dim-y_new-1][x_new] = 1
-                                                    self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                                    self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                                    self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                                # if exists in open list and the G value in open list is larger, then update its value and parent
-                                                elif Original_G > new_G:
-                                                    self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                                    self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                                    self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                                    self.G_updated[self.maze_dim-y_new-1][x_new] = 1
-                                        else:
-                                            break
-                                    else:
-                                        break
-                                else:
-                                    break
-                        else:
-                            break
-                self.open_list[self.maze_dim-y-1][x] = 0
-                self.close_list[self.maze_dim-y-1][x] = 1   
-                self.G_updated[self.maze_dim-y-1][x] = 0
-                self.visits[self.maze_dim-self.location[1]-1][self.location[0]] += 1
-                self.update_path()
-            else:
-                i_update = 0
+        open_heap = OpenList(self.get_visited_key)
+        open_heap.rebuild(self.map.cells_where(lambda m: (m.open_list == 1) & (m.visits > 0), 'open_list'))
+        path_steps = len(self.path)
+        expanded = 0
+        stop_time = None
+        if self.plan_time is not None:
+            stop_time = time.perf_counter() + self.plan_time
+        node = open_heap.pop()
+        while node is not None:
+            x, y = node
+
+            # add the nodes one move away to the open list, not passing dead ends
+            reachable = self.planner.neighbors((x, y))
+            for direction in [[0, 1], [1, 0], [0, -1], [-1, 0]]:
+                for move in range (1, 4):
+                    x_new = x + move * direction[0]
+                    y_new = y + move * direction[1]
+                    if (x_new, y_new) not in reachable or self.map.deads[x_new, y_new] != 0:
+                        break
+                    if self.map.open_list[x_new, y_new] == 0 and self.map.close_list[x_new, y_new] == 0:
+                        self.map.open_list[x_new, y_new] = 1
+                        open_heap.push((x_new, y_new))
+            self.map.open_list[x, y] = 0
+            self.map.close_list[x, y] = 1   
+            self.map.G_updated[x, y] = 0
+            self.map.visits[self.location[0], self.location[1]] += 1
+            open_heap.push((self.location[0], self.location[1]))
+            self.update_path()
+            # H2 scales with the path length, so a new path length changes every F value
+            if len(self.path) != path_steps:
+                path_steps = len(self.path)
+                open_heap.rebuild(open_heap.nodes())
+            expanded += 1
+            if self.plan_budget is not None and expanded >= self.plan_budget:
+                break
+            if stop_time is not None and time.perf_counter() > stop_time:
+                break
+            node = open_heap.pop()
+        return expanded
         
+    def exploration_bounds(self):
+        '''
+        Bounds on the 2nd round steps from start to goal: upper over the
+        passages known to be open (what the 2nd round takes if exploring
+        stops now), lower with every unknown passage taken as open (the best
+        any further exploring can reach). Also returns near, the steps over
+        known passages from every cell to the nearest cell with an unknown
+        side on some route shorter than upper, which is about the least
+        exploring that can improve the route; only searched as far as such
+        exploring can pay off, (upper - lower) * explore_value steps, and -1
+        beyond (None when no shorter route is possible).
+
+        Each part is kept until what it depends on changes: upper until a
+        passage is sensed open, the optimistic distances until one is sensed
+        to be a wall, and near until any passage is sensed.
+        '''
+        walls, opened = self.sensed
+        if self.bounds is not None and self.bounds[0] == (walls, opened):
+            return self.bounds[1:]
+        goal_cells = [[int(gx), int(gy)] for gx in self.goal_bounds for gy in self.goal_bounds]
+        # a tiled map is read through a dense copy, the arrays of a dense one directly
+        known = self.map
+        if self.map.tile_size is not None:
+            known = Window(self.map, 0, self.maze_dim, 0, self.maze_dim)
+        if self.upper_bound is None or self.upper_bound[0] != opened:
+            upper = int(cell_distances(known.wallv, known.wallh, goal_cells, target=(0, 0))[0, 0])
+            self.upper_bound = (opened, upper)
+        upper = self.upper_bound[1]
+        # cells further than upper from either end cannot be on a shorter route, so the optimistic
+        # distances are searched that far; upper only shrinks while no wall is found
+        if self.optimistic is None or self.optimistic[0] != walls or not 0 <= upper <= self.optimistic[1]:
+            optimisticv = (known.wallv == 1) | (known.knownv == 0)
+            optimistich = (known.wallh == 1) | (known.knownh == 0)
+            to_goal = cell_distances(optimisticv, optimistich, goal_cells, upper)
+            from_start = cell_distances(optimisticv, optimistich, [[0, 0]], upper)
+            self.optimistic = (walls, upper, to_goal, from_start)
+        to_goal, from_start = self.optimistic[2:]
+        lower = int(to_goal[0, 0])
+        near = None
+        if 0 <= lower < upper:
+            improving = (from_start >= 0) & (to_goal >= 0) & (from_start + to_goal < upper) & ~settled_cells(known)
+            near = cell_distances(known.wallv, known.wallh, improving, (upper - lower) * self.explore_value)
+        self.bounds = ((walls, opened), upper, lower, near)
+        return upper, lower, near
+
+    # stop exploring when even the best possible shorter route is not worth the steps to look for it
+    def bounded_stop(self):
+        if self.explore_value <= 0:
+            return False
+        upper, lower, near = self.exploration_bounds()
+        if near is None:
+            return upper == lower and upper >= 0
+        return near[self.location[0], self.location[1]] < 0
+
     # finish 1st round, start 2nd round, reset paremeters
     def reset_second(self):
         #for test
@@ -356,17 +446,102 @@ class Robot(object):
         print("1st time hit goal steps, run 0 total steps: {}, {}".format(self.step1, self.steps))
         print("path: {}".format(self.path))
         print("length: {}".format(len(self.path)-1))
-        # print(self.open_list)
-        # print(self.close_list)
-        # print(self.parents)
-        # print(self.visits)
+        # print(self.map.open_list)
+        # print(self.map.close_list)
+        # print(self.map.parents)
+        # print(self.map.visits)
         
+        self.explored = self.snapshot()
+        self.start_second()
+
+    # move back to the start and plan the 2nd round
+    def start_second(self):
         self.location = [0, 0]
         self.heading = 'up'
         self.contd = 0
         self.steps = 0
         self.hitgoal = 0
         self.round = 1
+
+        # plan the 2nd round over (cell, heading) with the tester's real moves
+        goal_cells = [[int(gx), int(gy)] for gx in self.goal_bounds for gy in self.goal_bounds]
+        if self.plan_budget is None and self.plan_time is None:
+            self.route = plan_route(self.map.wallv, self.map.wallh, goal_cells, tuple(self.location), headings.index(self.heading[0]))
+            if self.route is not None:
+                print("route steps: {}".format(len(self.route)))
+        else:
+            # until the field reaches the robot, it follows the 1st round path
+            self.cost_to_go = CostToGo(self.map.wallv, self.map.wallh, goal_cells)
+            self.pathexe = self.path[1:]
+            self.refine_cost_to_go()
+
+    # build more levels of the cost-to-go field within the planning budget
+    def refine_cost_to_go(self):
+        levels = 0
+        stop_time = None
+        if self.plan_time is not None:
+            stop_time = time.perf_counter() + self.plan_time
+        while self.cost_to_go.step():
+            levels += 1
+            if self.plan_budget is not None and levels >= self.plan_budget:
+                break
+            if stop_time is not None and time.perf_counter() > stop_time:
+                break
+
+    # everything learned in the 1st round as a dict of arrays
+    def snapshot(self):
+        state = dict((name, getattr(self.map, name).copy()) for name in snapshot_arrays)
+        state['rhs'] = self.planner.rhs.copy()
+        state['path'] = np.array(self.path, dtype=np.int32).reshape(-1, 2)
+        state['ends'] = np.array([self.x_end, self.y_end, self.x_end_0, self.y_end_0], dtype=np.float64)
+        state['step1'] = np.array(self.step1)
+        return state
+
+    # load a snapshot into a fresh robot, which is then ready for the 2nd round
+    def restore(self, state):
+        for name in snapshot_arrays:
+            getattr(self.map, name)[...] = state[name]
+        self.planner.rhs[...] = state['rhs']
+        self.path = state['path'].tolist()
+        self.index_path()
+        ends = state['ends'].tolist()
+        self.x_end, self.y_end = int(ends[0]), int(ends[1])
+        self.x_end_0, self.y_end_0 = ends[2], ends[3]
+        self.step1 = int(state['step1'])
+        self.explored = state
+        self.start_second()
+
+    # take the next action of the planned 2nd round route
+    def exe_route(self):
+        rotation, movement = self.route.pop(0)
+        return self.exe_action(rotation, movement)
+
+    def exe_action(self, rotation, movement):
+        if rotation == -90:
+            self.heading = dir_sensors[self.heading][0]
+        elif rotation == 90:
+            self.heading = dir_sensors[self.heading][2]
+        self.location[0] += dir_move[self.heading][0] * movement
+        self.location[1] += dir_move[self.heading][1] * movement
+        self.steps += 1
+        return rotation, movement
+
+    # 2nd round with budgeted planning: descend the cost-to-go field once it covers
+    # the robot, and follow the 1st round path until then
+    def exe_cost_to_go(self, sensors):
+        self.refine_cost_to_go()
+        state = (headings.index(self.heading[0]), self.location[0], self.location[1])
+        action = self.cost_to_go.next_action(*state)
+        # with no path left to follow, the field is finished here and now
+        while action is None and not self.pathexe and self.cost_to_go.step():
+            action = self.cost_to_go.next_action(*state)
+        if action is not None:
+            return self.exe_action(*action)
+        if not self.pathexe:
+            # no known route to the goal: stand still
+            self.steps += 1
+            return 0, 0
+        return self.exe_path(sensors)
             
     def next_move(self, sensors):
         '''
@@ -413,24 +588,29 @@ class Robot(object):
                 self.y_end = y_back
                 self.x_end_0 = x_back - dx/move
                 self.y_end_0 = y_back - dy/move
-                self.parents[self.maze_dim-y_back-1][x_back][0] = xp
-                self.parents[self.maze_dim-y_back-1][x_back][1] = yp
             else:
                 self.x_end = x
                 self.y_end = y
                 self.x_end_0 = x_back
                 self.y_end_0 = y_back
             
+            # the path to the end point, so that a 1st round stopped right away has one
+            self.update_path()
+            
             #for test
             self.step1 = self.steps
         
         #update walls
         if self.round == 0:
             self.update_neighwall(sensors)
+            self.update_costs()
               
         # stop 1st round and start 2nd round
-        # when: 1. total steps > 900 or 2. total hitgoal times > 3 or 3. total explore open list times; 4. total visit
-        if self.round == 0 and self.hitgoal == 1 and self.steps > 900:
+        # when: 1. total steps > reset_steps or 2. total hitgoal times > 3 or 3. total explore open list times; 4. total visit
+        if self.round == 0 and self.hitgoal == 1 and self.steps > self.reset_steps:
+            self.reset_second()
+            return ('Reset', 'Reset')
+        if self.round == 0 and self.hitgoal == 1 and self.path and self.bounded_stop():
             self.reset_second()
             return ('Reset', 'Reset')
         
@@ -439,13 +619,21 @@ class Robot(object):
         
         # mark if dead ends
         if sensors == [0,0,0]:
-            self.deads[self.maze_dim-y-1][x] = 1
+            self.map.deads[x, y] = 1
+            if self.pruner is not None:
+                self.pruner.touch(x, y)
         # if the node in front is a dead end or lead to dead end, mark current position lead to dead end
         elif sensors[0] == 0 and sensors[2] == 0:
             x_front_one = x + dir_move[self.heading][0]
             y_front_one = y + dir_move[self.heading][1]
-            if self.deads[self.maze_dim-y_front_one-1][x_front_one] > 0:
-                self.deads[self.maze_dim-y-1][x] = 2
+            if self.map.deads[x_front_one, y_front_one] > 0:
+                self.map.deads[x, y] = 2
+                if self.pruner is not None:
+                    self.pruner.touch(x, y)
+        # follow dead ends back through every corridor that now leads only to them
+        if self.round == 0 and self.pruner is not None:
+            self.pruner.hold(x, y)
+            self.pruner.prune()
          
         # execute planned path
         if self.contd == 1:
@@ -453,20 +641,23 @@ class Robot(object):
         else:
             if self.round == 0:
             
-                self.G_updated[self.maze_dim-y-1][x] = 0
+                self.map.G_updated[x, y] = 0
                 
                 # not hit goal, focus more on hitting goal
                 if self.hitgoal == 0:
                 
-                    # dataframe for all the neighbours
-                    df = pd.DataFrame(columns=['x_new', 'y_new', 'direction', 'forward', 'moves', 'abs_moves', 'F_value', 'visit', 'G_updated'])
+                    # all the neighbours as (x_new, y_new, direction, forward, moves)
+                    neighbors = []
+                    dead_neighbors = []
                     # check backward neighbours
                     sensor_back = self.check_back()
                     for move in range(0-sensor_back, 0, 1):
                         x_new = x + dir_move[self.heading][0] * move
                         y_new = y + dir_move[self.heading][1] * move
-                        if self.deads[self.maze_dim-y_new-1][x_new] == 0:
-                            df = df.append({'x_new':x_new, 'y_new':y_new, 'direction': 1, 'forward': -1, 'moves': move, 'abs_moves': abs(move), 'G_updated': 0}, ignore_index=True)
+                        if self.map.deads[x_new, y_new] == 0:
+                            neighbors.append((x_new, y_new, 1, -1, move))
+                        else:
+                            dead_neighbors.append((x_new, y_new, 1, -1, move))
                     # check forward neighbours 
                     for i in range(3):
                         if sensors[i] > 0:
@@ -478,55 +669,34 @@ class Robot(object):
                             for move in range(1,min(sensors[i],3)+1):
                                 x_new = x + dir_move[heading_new][0] * move
                                 y_new = y + dir_move[heading_new][1] * move
-                                if self.deads[self.maze_dim-y_new-1][x_new] == 0:
-                                    df = df.append({'x_new':x_new, 'y_new':y_new,'direction': i, 'forward':i%2, 'moves': move, 'abs_moves': abs(move),'G_updated': 0}, ignore_index=True)
-                    #loop through df, update open list, close list, parent, A* G value and other information of each neighbour
-                    for index, row in df.iterrows():
-                        x_new = int(row['x_new'])
-                        y_new = int(row['y_new'])
-                        Original_G = self.G[self.maze_dim-y_new-1][x_new]
-                        new_G = self.G[self.maze_dim-y-1][x] + 1
-                        # if exists in close list                        
-                        if self.close_list[self.maze_dim-y_new-1][x_new] == 1:
-                            if Original_G > new_G:
-                                self.close_list[self.maze_dim-y_new-1][x_new] = 0
-                                self.open_list[self.maze_dim-y_new-1][x_new] = 1
-                                self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                F_value = self.G[self.maze_dim-y_new-1][x_new] + self.get_H1(x_new,y_new)
-                                self.G_updated[self.maze_dim-y_new-1][x_new] = 1
-                                row['F_value'] = F_value
-                                row['visit'] = self.visits[self.maze_dim-y_new-1][x_new]
-                                row['G_updated'] = 1
-                            else:
-                                row['F_value'] = 99999
-                                row['visit'] = self.visits[self.maze_dim-y_new-1][x_new]
+                                if self.map.deads[x_new, y_new] == 0:
+                                    neighbors.append((x_new, y_new, i, i%2, move))
+                                else:
+                                    dead_neighbors.append((x_new, y_new, i, i%2, move))
+                    # when every neighbour is a dead end, walk back out through them
+                    if not neighbors:
+                        neighbors = dead_neighbors
+
+                    # priority to choose to which neighboor to move:
+                    # 1. small F_value; 2. less visit time; 3. moving forward (1) comes first, backwards (-1) last; 4. large movement
+                    ranker = CandidateRanker((1, 1, -1, -1, -1))
+                    #loop through neighbours, add new ones to the open list and rank them
+                    for x_new, y_new, direction, forward, moves in neighbors:
+                        # closed nodes are not worth a visit unless their G value improved, which reopens them
+                        if self.map.close_list[x_new, y_new] == 1:
+                            F_value = 99999
                         else:
-                            # if not exists in open list, add it to open list
-                            if self.open_list[self.maze_dim-y_new-1][x_new] == 0:
-                                self.open_list[self.maze_dim-y_new-1][x_new] = 1
-                                self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                            # if exists in open list and the G value in open list is larger, then update its value and parent
-                            elif Original_G > new_G:
-                                self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                self.G_updated[self.maze_dim-y_new-1][x_new] = 1
-                                row['G_updated'] = 1
-                            F_value = self.G[self.maze_dim-y_new-1][x_new] + self.get_H1(x_new,y_new)
-                            row['F_value'] = F_value
-                            row['visit'] = self.visits[self.maze_dim-y_new-1][x_new]
+                            self.map.open_list[x_new, y_new] = 1
+                            F_value = int(self.map.G[x_new, y_new]) + self.get_H1(x_new,y_new)
+                        G_updated = int(self.map.G_updated[x_new, y_new])
+                        visit = int(self.map.visits[x_new, y_new])
+                        ranker.push((F_value, visit, G_updated, forward, abs(moves)), (x_new, y_new, direction, moves))
                             
                     # move the current node from open to close list
-                    self.open_list[self.maze_dim-y-1][x] = 0
-                    self.close_list[self.maze_dim-y-1][x] = 1
+                    self.map.open_list[x, y] = 0
+                    self.map.close_list[x, y] = 1
 
-                    # priority to choose to which neighboor to move:
-                    # 1. small F_value; 2. less visit time; 3. moving forward (1) comes first, backwards (-1) last; 4. large movement
-                    df = df.sort_values(['F_value', 'visit', 'G_updated', 'forward', 'abs_moves'], ascending=[True, True, False, False, False], ignore_index=True) 
+                    ranked = ranker.ranked()
                     rotation = 0
                     #no randomness
                     row_num = 0
@@ -534,8 +704,8 @@ class Robot(object):
                     #test
                     if self.randomness > 0:
                         # add some randomness so that the robot can explore the whole map better                     
-                        if self.steps < self.maze_dim * 25:
-                            row_count = df.shape[0]
+                        if self.steps < self.maze_dim * self.random_window:
+                            row_count = len(ranked)
                             numberList = []
                             weightList = []
                             for i in range(row_count):
@@ -544,18 +714,16 @@ class Robot(object):
                             row_num = random.choices(numberList, weights=weightList, k=1)[0]
                     
                     # check if can hit goal directly
-                    for index, row in df.iterrows():
-                        x_new = int(row['x_new'])
-                        y_new = int(row['y_new'])
-                        if self.check_hitgoal([x_new, y_new]):
+                    for index, candidate in enumerate(ranked):
+                        if self.check_hitgoal([candidate[0], candidate[1]]):
                             row_num = index
 
-                    direction_i = df.reset_index()['direction'].iloc[row_num]
+                    direction_i = ranked[row_num][2]
                     if direction_i == 0:
                         rotation = -90
                     elif direction_i == 2:
                         rotation = 90
-                    movement = int(df.reset_index()['moves'].iloc[row_num])   
+                    movement = int(ranked[row_num][3])   
                     
                     # update parameter
                     if rotation == -90:
@@ -566,7 +734,7 @@ class Robot(object):
                     self.location[1] += dir_move[self.heading][1] * movement
                     self.location[0] = int(self.location[0])
                     self.location[1] = int(self.location[1])
-                    self.visits[self.maze_dim-self.location[1]-1][self.location[0]] += 1
+                    self.map.visits[self.location[0], self.location[1]] += 1
                     if not self.check_hitgoal(self.location):
                         self.steps += 1
                     
@@ -577,38 +745,14 @@ class Robot(object):
                     # update path visited
                     self.update_visited()
                     
-                    df_neighbor = pd.DataFrame(columns=['x_new', 'y_new', 'direction', 'moves'])
+                    # reachable neighbours, (x_new, y_new) -> (direction, moves)
+                    neighbors = {}
                     #check backward neighbours
                     sensor_back = self.check_back()
                     for move in range(0-sensor_back, 0, 1):
                         x_new = x + dir_move[self.heading][0] * move
                         y_new = y + dir_move[self.heading][1] * move
-                        df_neighbor = df_neighbor.append({'x_new':x_new, 'y_new':y_new, 'direction': 1, 'moves': move}, ignore_index=True)
-                        if self.deads[self.maze_dim-y_new-1][x_new] == 0:
-                            Original_G = self.G[self.maze_dim-y_new-1][x_new]
-                            new_G = self.G[self.maze_dim-y-1][x] + 1
-                            # if exists in close list
-                            if self.close_list[self.maze_dim-y_new-1][x_new] == 1:
-                                if Original_G > new_G:
-                                    self.close_list[self.maze_dim-y_new-1][x_new] = 0
-                                    self.open_list[self.maze_dim-y_new-1][x_new] = 1
-                                    self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                    self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                    self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                    self.G_updated[self.maze_dim-y_new-1][x_new] = 1
-                            else:
-                                # if not exists in open list, add it to open list
-                                if self.open_list[self.maze_dim-y_new-1][x_new] == 0:
-                                    self.open_list[self.maze_dim-y_new-1][x_new] = 1
-                                    self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                    self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                    self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                # if exists in open list and the G value in open list is larger, then update its value and parent
-                                elif Original_G > new_G:
-                                    self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                    self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                    self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                    self.G_updated[self.maze_dim-y_new-1][x_new] = 1
+                        neighbors.setdefault((x_new, y_new), (1, move))
                     # check forward neighbours
                     for i in range(3):
                         if sensors[i] > 0:
@@ -620,78 +764,48 @@ class Robot(object):
                             for move in range(1,min(sensors[i],3)+1):
                                 x_new = x + dir_move[heading_new][0] * move
                                 y_new = y + dir_move[heading_new][1] * move
-                                df_neighbor = df_neighbor.append({'x_new':x_new, 'y_new':y_new, 'direction': i, 'moves': move}, ignore_index=True)
-                                if self.deads[self.maze_dim-y_new-1][x_new] == 0:
-                                    Original_G = self.G[self.maze_dim-y_new-1][x_new]
-                                    new_G = self.G[self.maze_dim-y-1][x] + 1
-                                    # if exists in close list
-                                    if self.close_list[self.maze_dim-y_new-1][x_new] == 1:
-                                        if Original_G > new_G:
-                                            self.close_list[self.maze_dim-y_new-1][x_new] = 0
-                                            self.open_list[self.maze_dim-y_new-1][x_new] = 1
-                                            self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                            self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                            self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                            self.G_updated[self.maze_dim-y_new-1][x_new] = 1
-                                    else:
-                                        # if not exists in open list, add it to open list
-                                        if self.open_list[self.maze_dim-y_new-1][x_new] == 0:
-                                            self.open_list[self.maze_dim-y_new-1][x_new] = 1
-                                            self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                            self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                            self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                        # if exists in open list and the G value in open list is larger, then update its value and parent
-                                        elif Original_G > new_G:
-                                            self.G[self.maze_dim-y_new-1][x_new] = new_G
-                                            self.parents[self.maze_dim-y_new-1][x_new][0] = x
-                                            self.parents[self.maze_dim-y_new-1][x_new][1] = y
-                                            self.G_updated[self.maze_dim-y_new-1][x_new] = 1
+                                neighbors.setdefault((x_new, y_new), (i, move))
+                    # add new neighbours to the open list
+                    for x_new, y_new in neighbors:
+                        if self.map.deads[x_new, y_new] == 0 and self.map.close_list[x_new, y_new] == 0:
+                            self.map.open_list[x_new, y_new] = 1
 
                     # move the current position from open to close list
-                    self.open_list[self.maze_dim-y-1][x] = 0
-                    self.close_list[self.maze_dim-y-1][x] = 1
+                    self.map.open_list[x, y] = 0
+                    self.map.close_list[x, y] = 1
                     
                     # go to node in open list with least A* F_value
-                    df = pd.DataFrame(columns=['x_new', 'y_new', 'F_value', 'visit', 'G_updated', 'neighbor', 'G_neighbor', 'direction', 'moves'])
-                    for i in range(self.maze_dim):
-                        for j in range(self.maze_dim):
-                            if self.open_list[self.maze_dim-j-1][i] == 1 and (i != self.location[0] or j != self.location[1]) and self.deads[self.maze_dim-j-1][i] == 0:
-                                # include only one end node, not include other 3 goal nodes
-                                if (not self.check_hitgoal([i,j])) or (i == self.x_end and j == self.y_end):
-                                    G_updated = self.G_updated[self.maze_dim-j-1][i]
-                                    visit = self.visits[self.maze_dim-j-1][i]
-                                    G_value = self.G[self.maze_dim-j-1][i]
-                                    F_value = G_value + self.get_H2(i,j)
-                                    neighbor = 0
-                                    direction = 0
-                                    moves = 0
-                                    for index, row in df_neighbor.iterrows():
-                                        x_neighbor = int(row['x_new'])
-                                        y_neighbor = int(row['y_new'])
-                                        if i == x_neighbor and j == y_neighbor:
-                                            neighbor = 1
-                                            direction = int(row['direction'])
-                                            moves = int(row['moves'])
-                                            break
-                                    df = df.append({'x_new':i, 'y_new':j, 'F_value':F_value, 'visit': visit, 'G_updated': G_updated, 'neighbor': neighbor, 'G_neighbor': int((G_updated+neighbor)/2), 'direction': direction, 'moves': moves}, ignore_index=True)
+                    # priority: 1. neighbour with updated G value; 2. less visit time; 3. updated G value; 4. neighbour; 5. small F_value
+                    ranker = CandidateRanker((-1, 1, -1, -1, 1))
+                    for i, j in self.map.cells_where(lambda m: (m.open_list == 1) & (m.deads == 0), 'open_list'):
+                        if i != self.location[0] or j != self.location[1]:
+                            # include only one end node, not include other 3 goal nodes
+                            if (not self.check_hitgoal([i,j])) or (i == self.x_end and j == self.y_end):
+                                G_updated = int(self.map.G_updated[i, j])
+                                visit = int(self.map.visits[i, j])
+                                G_value = int(self.map.G[i, j])
+                                F_value = G_value + self.get_H2(i,j)
+                                neighbor = 0
+                                direction = 0
+                                moves = 0
+                                if (i, j) in neighbors:
+                                    neighbor = 1
+                                    direction, moves = neighbors[(i, j)]
+                                G_neighbor = int((G_updated+neighbor)/2)
+                                ranker.push((G_neighbor, visit, G_updated, neighbor, F_value), (i, j, neighbor, direction, moves))
                     # update parameters
-                    self.visits[self.maze_dim-self.location[1]-1][self.location[0]] += 1
-                    if df.shape[0] > 0:
-                        df = df.sort_values(['G_neighbor', 'visit', 'G_updated', 'neighbor', 'F_value'], ascending=[False, True, False, False, True], ignore_index=True)
-                        x_new = int(df.reset_index()['x_new'].iloc[0])
-                        y_new = int(df.reset_index()['y_new'].iloc[0])
-                        neighbor = int(df.reset_index()['neighbor'].iloc[0])
+                    self.map.visits[self.location[0], self.location[1]] += 1
+                    # the best candidate, or the next one when a node cannot be reached
+                    stop_checked = False
+                    for x_new, y_new, neighbor, direction, movement in ranker.ranked():
                         rotation = 0
-                        movement = 0
                         if neighbor == 1:
-                            direction = int(df.reset_index()['direction'].iloc[0])
                             if direction == 0:
                                 rotation = -90
                                 self.heading = dir_sensors[self.heading][0]
                             elif direction == 2:
                                 rotation = 90
                                 self.heading = dir_sensors[self.heading][2]
-                            movement = int(df.reset_index()['moves'].iloc[0])
                             self.location[0] += dir_move[self.heading][0] * movement
                             self.location[1] += dir_move[self.heading][1] * movement
                             self.location[0] = int(self.location[0])
@@ -702,56 +816,57 @@ class Robot(object):
                             return rotation, movement
                         else:
                             #if the total cost of recent A* Search is more than the gain (shorten path steps), proceed to 2nd run
-                            astar_num = 6
-                            self.path_len.insert(0,len(self.path))
-                            if len(self.astarcost) > astar_num:
-                                total_cost = 0
-                                for i in range(0,astar_num - 1):
-                                    total_cost += self.astarcost[i]
-                                gain = (self.path_len[astar_num - 1] - self.path_len[0]) * 30
-                                if total_cost > gain:
-                                    self.reset_second()
-                                    return ('Reset', 'Reset')
+                            if not stop_checked:
+                                stop_checked = True
+                                astar_num = self.astar_num
+                                self.path_len.insert(0,len(self.path))
+                                if len(self.astarcost) > astar_num:
+                                    total_cost = 0
+                                    for i in range(0,astar_num - 1):
+                                        total_cost += self.astarcost[i]
+                                    gain = (self.path_len[astar_num - 1] - self.path_len[0]) * self.gain_factor
+                                    if total_cost > gain:
+                                        self.reset_second()
+                                        return ('Reset', 'Reset')
                             
-                            #find a path from current location to the un-visited node with least F-value
-                            path_dest = []
-                            path_curr = []
-                            parent_dest = [x_new, y_new]
-                            parent_curr = self.location
-                            while parent_dest not in self.path:
-                                path_dest.insert(0, parent_dest)
-                                parent_dest = self.get_parent(parent_dest)
-                            while parent_curr not in self.path:
-                                path_curr.insert(0, parent_curr)
-                                parent_curr = self.get_parent(parent_curr)
-                            index_pdest = self.path.index(parent_dest)
-                            index_pcurr = self.path.index(parent_curr)
-                            self.pathexe = []
-                            if index_pdest > index_pcurr:
-                                for i in range(index_pcurr,index_pdest+1):
-                                    self.pathexe.append(self.path[i])
-                            else:
-                                for i in range(index_pdest,index_pcurr+1):
-                                    self.pathexe.append(self.path[i])
-                                self.pathexe.reverse()
-                            for node in path_dest:
-                                 self.pathexe.append(node)
-                            for node in path_curr:
-                                 self.pathexe.insert(0, node)
+                            #find the fastest known route from current location to the un-visited node with least F-value
+                            self.pathexe = self.junctions.route(self.location, [x_new, y_new])
+                            if self.pathexe is None:
+                                #up the parent tree to the path from both ends, and along the path in between
+                                path_dest, index_pdest = self.climb_to_path([x_new, y_new])
+                                path_curr, index_pcurr = self.climb_to_path(self.location)
+                                if path_dest is None or path_curr is None:
+                                    # no known way to the node: drop it and try the next candidate
+                                    self.map.open_list[x_new, y_new] = 0
+                                    self.map.close_list[x_new, y_new] = 1
+                                    continue
+                                if index_pdest > index_pcurr:
+                                    self.pathexe = self.path[index_pcurr:index_pdest+1]
+                                else:
+                                    self.pathexe = self.path[index_pdest:index_pcurr+1]
+                                    self.pathexe.reverse()
+                                path_dest.reverse()
+                                self.pathexe = path_curr + self.pathexe + path_dest
+                                self.pathexe.pop(0)
                             
-                            self.pathexe.pop(0)
                             self.contd = 1
                             self.astarcost.insert(0, len(self.pathexe))
                             return self.exe_path(sensors)
-                    else:
-                        # update parameter
-                        self.reset_second()                        
-                        return ('Reset', 'Reset')
+                    
+                    # no candidate left to explore
+                    self.reset_second()
+                    return ('Reset', 'Reset')
                     
             # 2nd round
-            else:
-                self.pathexe = []
-                self.pathexe = self.path
-                self.pathexe.pop(0)
+            elif self.cost_to_go is not None:
+                return self.exe_cost_to_go(sensors)
+            elif self.route:
+                return self.exe_route()
+            elif len(self.path) > 1:
+                self.pathexe = self.path[1:]
                 self.contd = 1
                 return self.exe_path(sensors)
+            else:
+                # no known route to the goal: stand still
+                self.steps += 1
+                return 0, 0
@@ -0,0 +1,250 @@
+from maze import run_lengths
+import numpy as np
+
+# headings by index; turning right adds 1, turning left subtracts 1
+headings = ['u', 'r', 'd', 'l']
+heading_move = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+# every action the tester accepts, in the order ties are broken:
+# forward moves first, then backward moves, then rotations on the spot
+actions = ([(rotation, movement) for movement in (3, 2, 1) for rotation in (0, -90, 90)] +
+           [(rotation, movement) for movement in (-1, -2, -3) for rotation in (0, -90, 90)] +
+           [(-90, 0), (90, 0)])
+
+def known_reach(wallv, wallh):
+    '''
+    Returns a (4, dim, dim) array with, for each heading index and cell, how
+    many cells the robot can move in that direction through passages known
+    to be open. wallv[x, y] is the passage between (x, y) and (x+1, y),
+    wallh[x, y] the passage between (x, y) and (x, y+1).
+    '''
+    wallv = np.asarray(wallv) == 1
+    wallh = np.asarray(wallh) == 1
+    dim = wallh.shape[0]
+    passable = np.zeros((4, dim, dim), dtype=bool)
+    passable[0, :, :-1] = wallh
+    passable[1, :-1, :] = wallv
+    passable[2, :, 1:] = wallh
+    passable[3, 1:, :] = wallv
+    return np.stack([run_lengths(passable[0], 1, True),
+                     run_lengths(passable[1], 0, True),
+                     run_lengths(passable[2], 1, False),
+                     run_lengths(passable[3], 0, False)])
+
+def shift_slices(direction, distance, dim):
+    # the source and destination index slices of a shift of (dim, dim) cells
+    dx, dy = heading_move[direction]
+    dx *= distance
+    dy *= distance
+    return ((slice(max(-dx, 0), dim + min(-dx, 0)), slice(max(-dy, 0), dim + min(-dy, 0))),
+            (slice(max(dx, 0), dim + min(dx, 0)), slice(max(dy, 0), dim + min(dy, 0))))
+
+def shift(mask, direction, distance):
+    # move every True cell of a (dim, dim) mask distance cells along heading direction
+    source, dest = shift_slices(direction, distance, mask.shape[0])
+    result = np.zeros_like(mask)
+    result[dest] = mask[source]
+    return result
+
+def apply_action(reach, mask, h, action):
+    '''
+    Applies one action to every state of heading h in a (dim, dim) mask.
+    Returns the new heading, the direction and distance moved, and the mask
+    of the cells reached; states that would run into a known wall are left
+    out.
+    '''
+    rotation, movement = action
+    new_h = (h + rotation // 90) % 4
+    direction = new_h if movement >= 0 else (new_h + 2) % 4
+    distance = abs(movement)
+    sources = mask & (reach[direction] >= distance)
+    return new_h, direction, distance, shift(sources, direction, distance)
+
+def plan_route(wallv, wallh, goal_cells, start=(0, 0), heading=0):
+    '''
+    Finds the shortest sequence of tester actions (rotation, movement) that
+    takes a robot at start facing heading (an index into headings) into any
+    of goal_cells, only crossing passages known to be open. One action
+    rotates by -90, 0 or +90 degrees and then moves up to three cells
+    forwards or backwards, so the search runs over (heading, x, y) states,
+    one breadth-first level per time step, with whole-array operations.
+    Returns None if no goal cell can be reached.
+    '''
+    reach = known_reach(wallv, wallh)
+    dim = reach.shape[1]
+    goal = np.zeros((dim, dim), dtype=bool)
+    for x, y in goal_cells:
+        goal[x, y] = True
+
+    # for every state reached, the action that reached it and the previous state
+    reached = np.zeros((4, dim, dim), dtype=bool)
+    previous = np.full((4, dim, dim), -1, dtype=np.int64)
+    taken = np.full((4, dim, dim), -1, dtype=np.int8)
+    state_index = np.arange(4 * dim * dim).reshape(4, dim, dim)
+
+    reached[heading][start] = True
+    frontier = np.zeros((4, dim, dim), dtype=bool)
+    frontier[heading][start] = True
+    end_state = None
+    if goal[start]:
+        return []
+    while frontier.any() and end_state is None:
+        new_frontier = np.zeros((4, dim, dim), dtype=bool)
+        for h in range(4):
+            if not frontier[h].any():
+                continue
+            for action_id, action in enumerate(actions):
+                new_h, direction, distance, targets = apply_action(reach, frontier[h], h, action)
+                new_states = targets & ~reached[new_h]
+                if not new_states.any():
+                    continue
+                reached[new_h] |= new_states
+                new_frontier[new_h] |= new_states
+                taken[new_h][new_states] = action_id
+                source_index = shift(state_index[h], direction, distance)
+                previous[new_h][new_states] = source_index[new_states]
+        frontier = new_frontier
+        # goal cells reached at this level, in heading then cell order
+        hits = np.argwhere(frontier & goal)
+        if len(hits):
+            end_state = tuple(hits[0])
+
+    if end_state is None:
+        return None
+    route = []
+    state = np.ravel_multi_index(end_state, (4, dim, dim))
+    start_state = np.ravel_multi_index((heading,) + tuple(start), (4, dim, dim))
+    while state != start_state:
+        h, x, y = np.unravel_index(state, (4, dim, dim))
+        route.append(actions[taken[h, x, y]])
+        state = previous[h, x, y]
+    route.reverse()
+    return route
+
+def route_distances(wallv, wallh, start=(0, 0), heading=0):
+    '''
+    Returns the (4, dim, dim) array of the fewest actions that take a robot
+    at start facing heading to every (heading, x, y) state, -1 for states
+    that cannot be reached, with the same moves as plan_route.
+    '''
+    reach = known_reach(wallv, wallh)
+    dim = reach.shape[1]
+    distance = np.full((4, dim, dim), -1, dtype=np.int32)
+    distance[heading][tuple(start)] = 0
+    frontier = distance == 0
+    level = 0
+    while frontier.any():
+        level += 1
+        new_frontier = np.zeros_like(frontier)
+        for h in range(4):
+            if not frontier[h].any():
+                continue
+            for action in actions:
+                new_h, direction, moved, targets = apply_action(reach, frontier[h], h, action)
+                new_frontier[new_h] |= targets
+        frontier = new_frontier & (distance < 0)
+        distance[frontier] = level
+    return distance
+
+def cell_distances(wallv, wallh, cells, limit=None, target=None):
+    '''
+    Returns the (dim, dim) array of the fewest straight moves of up to three
+    cells between every cell and the nearest of cells (a list of (x, y), or
+    a boolean mask), with turns for free, -1 for cells that cannot be
+    reached (or only in more than limit moves). With a target cell given,
+    the search stops once it is reached, leaving further cells at -1.
+    '''
+    reach = known_reach(wallv, wallh)
+    dim = reach.shape[1]
+    distance = np.full((dim, dim), -1, dtype=np.int32)
+    if isinstance(cells, np.ndarray) and cells.dtype == bool:
+        distance[cells] = 0
+    else:
+        for x, y in cells:
+            distance[x, y] = 0
+    # each move as the cells it can leave from and the slices it shifts between
+    moves = []
+    for direction in range(4):
+        for moved in range(1, 4):
+            source, dest = shift_slices(direction, moved, dim)
+            moves.append(((reach[direction] >= moved)[source], source, dest))
+    frontier = distance == 0
+    level = 0
+    while frontier.any() and (limit is None or level < limit):
+        level += 1
+        new_frontier = np.zeros_like(frontier)
+        for can_move, source, dest in moves:
+            new_frontier[dest] |= frontier[source] & can_move
+        frontier = new_frontier & (distance < 0)
+        distance[frontier] = level
+        if target is not None and distance[target[0], target[1]] >= 0:
+            break
+    return distance
+
+def route_cells(route, start=(0, 0), heading=0):
+    # cells a robot passes through when it follows route: one cell per action
+    location = list(start)
+    cells = [list(location)]
+    for rotation, movement in route:
+        heading = (heading + rotation // 90) % 4
+        location[0] += heading_move[heading][0] * movement
+        location[1] += heading_move[heading][1] * movement
+        cells.append(list(location))
+    return cells
+
+class CostToGo(object):
+    def __init__(self, wallv, wallh, goal_cells):
+        '''
+        Fewest actions from every (heading, x, y) state into any of
+        goal_cells, with the same moves as plan_route, built one level of a
+        backward breadth-first search per call to step(). distance is -1
+        for states not reached yet, so a partly built field is already
+        exact for every state it covers; next_action() follows it down to
+        the goal from any of those states.
+        '''
+        self.reach = known_reach(wallv, wallh)
+        dim = self.reach.shape[1]
+        self.distance = np.full((4, dim, dim), -1, dtype=np.int32)
+        for x, y in goal_cells:
+            self.distance[:, x, y] = 0
+        self.frontier = self.distance == 0
+        self.level = 0
+        self.done = False
+
+    # add the states one action further from the goal; returns False once the field is complete
+    def step(self):
+        if self.done:
+            return False
+        self.level += 1
+        sources = np.zeros_like(self.frontier)
+        for new_h in range(4):
+            if not self.frontier[new_h].any():
+                continue
+            for rotation, movement in actions:
+                h = (new_h - rotation // 90) % 4
+                direction = new_h if movement >= 0 else (new_h + 2) % 4
+                distance = abs(movement)
+                if distance == 0:
+                    sources[h] |= self.frontier[new_h]
+                else:
+                    sources[h] |= shift(self.frontier[new_h], (direction + 2) % 4, distance) & (self.reach[direction] >= distance)
+        self.frontier = sources & (self.distance < 0)
+        self.distance[self.frontier] = self.level
+        self.done = not self.frontier.any()
+        return not self.done
+
+    # first action in tie order that takes state (h, x, y) one level closer to the goal, None if not covered yet
+    def next_action(self, h, x, y):
+        level = self.distance[h, x, y]
+        if level <= 0:
+            return None
+        for rotation, movement in actions:
+            new_h = (h + rotation // 90) % 4
+            direction = new_h if movement >= 0 else (new_h + 2) % 4
+            distance = abs(movement)
+            if self.reach[direction, x, y] < distance:
+                continue
+            dx, dy = heading_move[direction]
+            if self.distance[new_h, x + dx * distance, y + dy * distance] == level - 1:
+                return rotation, movement
+        return None
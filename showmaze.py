@@ -1,16 +1,25 @@
 from maze import Maze
-import turtle
+from mazerender import render_file
 import sys
 
 if __name__ == '__main__':
     '''
     This function uses Python's turtle library to draw a picture of the maze
-    given as an argument when running the script.
+    given as an argument when running the script. If an image file name
+    (.png or .svg) is given as a second argument, the maze is rendered to
+    that file instead, without opening a window.
     '''
 
     # Create a maze based on input argument on command line.
     testmaze = Maze( str(sys.argv[1]) )
 
+    if len(sys.argv) > 2:
+        render_file(testmaze.walls, str(sys.argv[2]))
+        sys.exit()
+
+    # imported only to draw in a window, so image export works without tkinter
+    import turtle
+
     # Intialize the window and drawing turtle.
     window = turtle.Screen()
     wally = turtle.Turtle()
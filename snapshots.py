@@ -0,0 +1,106 @@
+from maze import Maze
+from robot import Robot
+from tester import run_trial
+from sweep import code_hash, knob_defaults
+import numpy as np
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# Robot constructor arguments that change what the 1st run learns
+robot_knobs = sorted(knob_defaults) + ['plan_budget', 'plan_time']
+
+def robot_key(robot, code_key):
+    '''
+    Hash of the robot code (code_key, see sweep.code_hash) and the knob
+    values of a robot, so that a snapshot is not restored into a robot
+    that would have explored differently.
+    '''
+    knobs = [(name, getattr(robot, name)) for name in robot_knobs]
+    return hashlib.sha256(json.dumps([code_key, knobs]).encode()).hexdigest()
+
+def snapshot_file(cache_dir, maze, key):
+    # snapshots are stored under the content hash of the maze they were taken in and the robot key
+    return os.path.join(cache_dir, '{}-{}.npz'.format(maze.content_hash(), key[:16]))
+
+def save_snapshot(robot, result, maze, key, filename):
+    '''
+    Writes the robot's 1st round snapshot (Robot.explored) together with the
+    content hash of the maze, the robot key and the 1st run's time steps and
+    moves from the run_trial result, as a compressed .npz file.
+    '''
+    np.savez_compressed(filename, maze_hash=np.array(maze.content_hash()), robot_key=np.array(key),
+                        runtime=np.array(result['runtimes'][0]),
+                        moves=np.array(result['moves'][0]), **robot.explored)
+
+def load_snapshot(robot, maze, key, filename):
+    '''
+    Restores a snapshot file into a fresh robot, leaving it ready for the 2nd
+    run, and returns the 1st run as run_trial's first_run argument.
+    '''
+    with np.load(filename) as data:
+        state = dict(data)
+    if str(state.pop('maze_hash')) != maze.content_hash():
+        raise Exception('Snapshot {} was taken in a different maze!'.format(filename))
+    if str(state.pop('robot_key')) != key:
+        raise Exception('Snapshot {} was taken by different robot code or knobs!'.format(filename))
+    first_run = {'runtime': int(state.pop('runtime')), 'moves': int(state.pop('moves'))}
+    robot.restore(state)
+    return first_run
+
+def run_cached_trial(maze, cache_dir, robot_factory=Robot, verbose=False, code_key=None):
+    '''
+    Like tester.run_trial, but the 1st run is only explored once per maze,
+    robot code and knob setting: the robot's knowledge at the end of it is
+    saved in cache_dir, and later such trials restore it and only run the
+    2nd run. code_key is sweep.code_hash(), worked out here if not given.
+    '''
+    if code_key is None:
+        code_key = code_hash()
+    robot = robot_factory(maze.dim)
+    key = robot_key(robot, code_key)
+    filename = snapshot_file(cache_dir, maze, key)
+    if os.path.exists(filename):
+        first_run = load_snapshot(robot, maze, key, filename)
+        return run_trial(maze, lambda dim: robot, verbose, first_run=first_run)
+
+    result = run_trial(maze, lambda dim: robot, verbose)
+    if len(result['runtimes']) and robot.explored is not None:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        save_snapshot(robot, result, maze, key, filename)
+    return result
+
+if __name__ == '__main__':
+    '''
+    This script times the 2nd run of the robot in robot.py on a maze many
+    times, exploring the maze only once and restoring that knowledge for
+    every repetition. The snapshot is kept in a temporary directory unless
+    --cache names one to keep it in; it is only reused by the same robot
+    code and knobs.
+    '''
+    parser = argparse.ArgumentParser(description='Time the 2nd run from a saved 1st run snapshot.')
+    parser.add_argument('maze', help='maze file')
+    parser.add_argument('--cache', help='snapshot directory to keep snapshots in (a temporary one by default)')
+    parser.add_argument('--repeats', type=int, default=100, help='number of 2nd runs')
+    args = parser.parse_args()
+
+    maze = Maze(args.maze)
+    with contextlib.ExitStack() as stack:
+        cache_dir = args.cache
+        if cache_dir is None:
+            cache_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        devnull = stack.enter_context(open(os.devnull, 'w'))
+        stack.enter_context(contextlib.redirect_stdout(devnull))
+        code_key = code_hash()
+        run_cached_trial(maze, cache_dir, code_key=code_key)
+        start = time.perf_counter()
+        for repeat in range(args.repeats):
+            result = run_cached_trial(maze, cache_dir, code_key=code_key)
+        elapsed = time.perf_counter() - start
+    print('score: {}'.format(result['score']))
+    print('{} second runs in {:.3f} s, {:.2f} ms each'.format(args.repeats, elapsed, elapsed / args.repeats * 1e3))
@@ -0,0 +1,137 @@
+from maze import Maze
+from routeplanner import plan_route, route_distances, cell_distances
+from tester import train_score_mult
+from collections import OrderedDict
+import numpy as np
+import argparse
+import os
+
+# directory of the default on-disk cache, and its size limit in bytes
+default_cache_dir = os.environ.get('MAZE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'maze-solutions'))
+default_max_bytes = 64 * 1024 * 1024
+
+def maze_passages(maze):
+    # the maze's open passages in the robot's wallv / wallh layout
+    wallv = maze.passable[1][:-1, :].astype(np.uint8)
+    wallh = maze.passable[0][:, :-1].astype(np.uint8)
+    return wallv, wallh
+
+def solve(maze):
+    '''
+    Computes the artifacts of a maze that only depend on its walls:
+    - route: the fewest tester actions from the start (facing up) into the
+      goal, as (rotation, movement) rows
+    - start_distance: fewest actions from the start to every (heading, x, y)
+    - goal_distance: fewest straight moves from every cell to the goal
+    - min_score: the best score any robot can get, reaching the goal along
+      route in both runs plus one step to reset after the first (NaN, with
+      an empty route, if the goal cannot be reached)
+    '''
+    wallv, wallh = maze_passages(maze)
+    goal_bounds = [maze.dim // 2 - 1, maze.dim // 2]
+    goal_cells = [[x, y] for x in goal_bounds for y in goal_bounds]
+    route = plan_route(wallv, wallh, goal_cells)
+    if route is None:
+        min_score = np.nan
+        route = []
+    else:
+        min_score = len(route) + train_score_mult * (len(route) + 1)
+    return {'route': np.array(route, dtype=np.int16).reshape(-1, 2),
+            'start_distance': route_distances(wallv, wallh),
+            'goal_distance': cell_distances(wallv, wallh, goal_cells),
+            'min_score': np.array(min_score)}
+
+class SolutionCache(object):
+    def __init__(self, cache_dir=default_cache_dir, max_bytes=default_max_bytes, memo_size=256):
+        '''
+        Content-addressed store of solve() results, keyed by the maze's
+        content hash. Results are kept in an in-process memo of up to
+        memo_size mazes and, if cache_dir is not None, in one .npz file per
+        maze. Files are evicted least recently used first (by modification
+        time, refreshed on every hit) once they take more than max_bytes.
+        '''
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memo_size = memo_size
+        self.memo = OrderedDict()
+
+    def get(self, maze):
+        key = maze.content_hash()
+        if key in self.memo:
+            self.memo.move_to_end(key)
+            return self.memo[key]
+        solution = self.load(key)
+        if solution is None:
+            solution = solve(maze)
+            self.store(key, solution)
+        self.memo[key] = solution
+        if len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+        return solution
+
+    def filename(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def load(self, key):
+        if self.cache_dir is None:
+            return None
+        filename = self.filename(key)
+        try:
+            with np.load(filename) as data:
+                solution = dict(data)
+            os.utime(filename)
+        except (OSError, ValueError):
+            # missing, or removed or damaged by another process
+            return None
+        return solution
+
+    def store(self, key, solution):
+        if self.cache_dir is None:
+            return
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        # write under a temporary name first so that readers never see half a file
+        temp_name = self.filename(key) + '.{}.tmp'.format(os.getpid())
+        with open(temp_name, 'wb') as f_out:
+            np.savez_compressed(f_out, **solution)
+        os.replace(temp_name, self.filename(key))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for mtime, size, name in entries)
+        for mtime, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= size
+
+# cache shared by the scripts of this project
+default_cache = SolutionCache()
+
+def get_solution(maze):
+    return default_cache.get(maze)
+
+if __name__ == '__main__':
+    '''
+    This script prints the shortest route and the minimum possible score of
+    the mazes given as arguments, filling the solution cache.
+    '''
+    parser = argparse.ArgumentParser(description='Solve mazes through the solution cache.')
+    parser.add_argument('mazes', nargs='+', help='maze files')
+    args = parser.parse_args()
+
+    for filename in args.mazes:
+        solution = get_solution(Maze(filename))
+        print('{}: shortest route {} steps, minimum score {:4.3f}'.format(
+            filename, len(solution['route']), float(solution['min_score'])))
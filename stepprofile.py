@@ -0,0 +1,149 @@
+from maze import Maze
+from robot import Robot
+from tester import run_trial
+import numpy as np
+import argparse
+import csv
+import json
+import time
+import tracemalloc
+
+# phases of one tester step, in the order they run
+phases = ['sense', 'robot', 'rotate', 'move', 'goal']
+
+# upper bounds in microseconds of the summary histogram buckets
+bucket_bounds = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf')]
+
+class StepProfiler(object):
+    def __init__(self, allocations=False, callback=None, keep_trace=True):
+        '''
+        Collects a per-step breakdown of a tester.run_trial loop. Pass it as
+        run_trial(..., profiler=...); without a profiler the tester does no
+        extra work. Every step records the time spent in each of phases, and
+        with allocations set also the memory allocated during the step
+        (net and peak bytes, from tracemalloc). callback, if given, is
+        called with every step record as soon as the step ends.
+        '''
+        self.allocations = allocations
+        self.callback = callback
+        self.keep_trace = keep_trace
+        self.trace = []
+        self.durations = dict((phase, []) for phase in phases)
+        self.record = None
+        self.last = None
+        self.started_tracing = False
+
+    def start_trial(self):
+        if self.allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def end_trial(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def begin_step(self, run, total_time):
+        self.record = {'run': run, 'time': total_time}
+        for phase in phases:
+            self.record[phase] = 0.0
+        if self.allocations:
+            tracemalloc.reset_peak()
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+        self.last = time.perf_counter()
+
+    # close the phase that just ran, and store any values it produced
+    def mark(self, phase, **values):
+        now = time.perf_counter()
+        self.record[phase] = now - self.last
+        self.record.update(values)
+        self.last = now
+
+    def end_step(self, robot_pos):
+        record = self.record
+        if self.allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            record['alloc_bytes'] = current - self.mem_start
+            record['peak_bytes'] = peak - self.mem_start
+        record['x'], record['y'] = robot_pos['location']
+        record['heading'] = robot_pos['heading']
+        for phase in phases:
+            self.durations[phase].append(record[phase])
+        if self.keep_trace:
+            self.trace.append(record)
+        if self.callback is not None:
+            self.callback(record)
+        self.record = None
+
+    def summary(self):
+        '''
+        Per phase: number of steps, total and mean time in seconds, the 50th,
+        95th and maximum step time in microseconds, and a histogram of step
+        times as a list of step counts per bucket_bounds entry.
+        '''
+        result = {}
+        for phase in phases:
+            us = np.array(self.durations[phase]) * 1e6
+            if not len(us):
+                result[phase] = {'count': 0}
+                continue
+            counts = np.bincount(np.searchsorted(bucket_bounds, us), minlength=len(bucket_bounds))
+            result[phase] = {'count': len(us),
+                             'total_s': float(us.sum()) / 1e6,
+                             'mean_us': float(us.mean()),
+                             'p50_us': float(np.percentile(us, 50)),
+                             'p95_us': float(np.percentile(us, 95)),
+                             'max_us': float(us.max()),
+                             'histogram': [int(count) for count in counts]}
+        return result
+
+    def format_summary(self, width=40):
+        summary = self.summary()
+        total = sum(phase.get('total_s', 0.0) for phase in summary.values()) or 1.0
+        lines = []
+        for phase in phases:
+            stats = summary[phase]
+            if not stats['count']:
+                continue
+            lines.append('{}: {} steps, {:.4f} s ({:.1%}), mean {:.1f} us, p50 {:.1f} us, p95 {:.1f} us, max {:.1f} us'.format(
+                phase, stats['count'], stats['total_s'], stats['total_s'] / total,
+                stats['mean_us'], stats['p50_us'], stats['p95_us'], stats['max_us']))
+            most = max(stats['histogram'])
+            for bound, count in zip(bucket_bounds, stats['histogram']):
+                if count:
+                    label = '<= {:g} us'.format(bound) if bound != float('inf') else '> {:g} us'.format(bucket_bounds[-2])
+                    lines.append('  {:>12s} {:6d} {}'.format(label, count, '#' * max(1, count * width // most)))
+        return '\n'.join(lines)
+
+    # write the per-step trace as JSON, or as CSV if the file name ends in .csv
+    def write_trace(self, filename):
+        if filename.endswith('.csv'):
+            fields = ['run', 'time', 'rotation', 'movement', 'x', 'y', 'heading'] + phases
+            if self.allocations:
+                fields += ['alloc_bytes', 'peak_bytes']
+            with open(filename, 'w', newline='') as f_out:
+                writer = csv.DictWriter(f_out, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(self.trace)
+        else:
+            with open(filename, 'w') as f_out:
+                json.dump(self.trace, f_out, indent=1)
+
+
+if __name__ == '__main__':
+    '''
+    This script runs one trial of the robot in robot.py with the step profiler
+    and prints the time spent in each phase of the tester loop.
+    '''
+    parser = argparse.ArgumentParser(description='Profile the tester loop phase by phase.')
+    parser.add_argument('maze', help='maze file')
+    parser.add_argument('--allocations', action='store_true', help='also record memory allocated per step')
+    parser.add_argument('--trace', help='write the per-step trace to this file (.json or .csv)')
+    args = parser.parse_args()
+
+    profiler = StepProfiler(allocations=args.allocations)
+    result = run_trial(Maze(args.maze), Robot, profiler=profiler)
+    print('score: {}'.format(result['score']))
+    print(profiler.format_summary())
+    if args.trace:
+        profiler.write_trace(args.trace)
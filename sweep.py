@@ -0,0 +1,232 @@
+from maze import Maze
+from robot import Robot
+from tester import run_trial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import contextlib
+import csv
+import functools
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+
+# the Robot constructor's exploration knobs and their defaults
+knob_defaults = {'randomness': 0, 'random_window': 25, 'reset_steps': 900,
+                 'astar_num': 6, 'gain_factor': 30, 'explore_value': 30, 'prune_corridors': 0}
+
+def grid_points(space):
+    '''
+    Every combination of the values in space, a dict of knob name -> list
+    of values, as a list of knob dicts. Knobs not in space keep their
+    defaults.
+    '''
+    names = sorted(space)
+    points = []
+    for values in itertools.product(*[space[name] for name in names]):
+        point = dict(knob_defaults)
+        point.update(zip(names, values))
+        points.append(point)
+    return points
+
+def random_points(space, count, seed=0):
+    # count distinct knob dicts with every knob in space drawn from its values
+    rng = random.Random(seed)
+    names = sorted(space)
+    total = 1
+    for name in names:
+        total *= len(space[name])
+    points = []
+    while len(points) < min(count, total):
+        point = dict(knob_defaults)
+        for name in names:
+            point[name] = rng.choice(space[name])
+        if point not in points:
+            points.append(point)
+    return points
+
+# the modules whose code decides the result of a trial
+trial_modules = ['robot', 'candidates', 'openlist', 'knowledge', 'tiles', 'lpastar',
+                 'deadends', 'junctions', 'routeplanner', 'tester', 'maze']
+
+def code_hash():
+    '''
+    Hash of the source of trial_modules, so that cached trials are not
+    reused once the robot or the rules it is scored by change.
+    '''
+    digest = hashlib.sha256()
+    for name in trial_modules:
+        __import__(name)
+        with open(sys.modules[name].__file__, 'rb') as f_in:
+            digest.update(f_in.read())
+    return digest.hexdigest()
+
+def trial_key(maze_key, seed, knobs, code_key):
+    return json.dumps([maze_key, seed, sorted(knobs.items()), code_key])
+
+def load_cache(filename):
+    '''
+    Reads the trials a sweep has completed, one JSON object per line, into
+    a dict keyed by trial_key. A line cut short by an interrupted sweep is
+    skipped.
+    '''
+    done = {}
+    if filename is None or not os.path.exists(filename):
+        return done
+    with open(filename) as f_in:
+        for line in f_in:
+            try:
+                trial = json.loads(line)
+            except ValueError:
+                continue
+            done[trial['key']] = trial
+    return done
+
+def run_sweep_job(job):
+    # one (maze file, seed, knobs) trial, with the robot's printing discarded
+    filename, seed, knobs = job
+    random.seed(seed)
+    maze = Maze(filename)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = run_trial(maze, functools.partial(Robot, **knobs))
+    return {'score': result['score'],
+            'runtimes': result['runtimes'],
+            'total_time': result['total_time'],
+            'wall_time': result['wall_time']}
+
+def run_sweep(filenames, points, seeds=(0,), workers=None, cache=None):
+    '''
+    Runs every knob dict in points on every maze file with every seed across
+    a process pool, using up to workers processes (all cores by default).
+    Trials already in the cache file are not run again, and every new trial
+    is appended to it as soon as it completes, so an interrupted sweep
+    resumes where it stopped. Trials are keyed by the maze's content hash,
+    so renamed maze files still hit the cache, and by the code_hash of the
+    robot, so trials of older code do not. Returns all trials of the sweep
+    as dicts with the maze, seed, knobs and result.
+    '''
+    maze_keys = dict((filename, Maze(filename).content_hash()) for filename in filenames)
+    code_key = code_hash()
+    done = load_cache(cache)
+    trials = []
+    jobs = {}
+    for knobs in points:
+        for filename in filenames:
+            for seed in seeds:
+                key = trial_key(maze_keys[filename], seed, knobs, code_key)
+                trials.append(key)
+                if key not in done and key not in jobs:
+                    jobs[key] = (filename, seed, knobs)
+
+    if jobs:
+        workers = workers or os.cpu_count() or 1
+        out = open(cache, 'a') if cache is not None else None
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = dict((pool.submit(run_sweep_job, job), key) for key, job in jobs.items())
+                for future in as_completed(futures):
+                    key = futures[future]
+                    filename, seed, knobs = jobs[key]
+                    trial = {'key': key, 'maze': filename, 'seed': seed, 'knobs': knobs}
+                    trial.update(future.result())
+                    done[key] = trial
+                    if out is not None:
+                        out.write(json.dumps(trial) + '\n')
+                        out.flush()
+        finally:
+            if out is not None:
+                out.close()
+    return [done[key] for key in trials]
+
+def rank(trials):
+    '''
+    Groups trials by knobs and ranks the groups: fewest failed trials first,
+    then lowest mean score, then lowest worst-case score. Each row holds the
+    knobs, the number of trials and failures, and the mean and worst score
+    of the completed trials (None if all failed).
+    '''
+    groups = {}
+    for trial in trials:
+        key = json.dumps(sorted(trial['knobs'].items()))
+        groups.setdefault(key, (trial['knobs'], []))[1].append(trial['score'])
+    rows = []
+    for knobs, scores in groups.values():
+        completed = [score for score in scores if score is not None]
+        rows.append({'knobs': knobs,
+                     'trials': len(scores),
+                     'failed': len(scores) - len(completed),
+                     'mean_score': sum(completed) / len(completed) if completed else None,
+                     'worst_score': max(completed) if completed else None})
+    inf = float('inf')
+    rows.sort(key=lambda row: (row['failed'],
+                               inf if row['mean_score'] is None else row['mean_score'],
+                               inf if row['worst_score'] is None else row['worst_score']))
+    return rows
+
+def format_table(rows):
+    names = sorted(knob_defaults)
+    lines = ['{:>4s}  {}  {:>6s} {:>6s} {:>8s} {:>8s}'.format(
+        'rank', '  '.join('{:>13s}'.format(name) for name in names), 'trials', 'failed', 'mean', 'worst')]
+    for i, row in enumerate(rows):
+        mean = '-' if row['mean_score'] is None else '{:8.3f}'.format(row['mean_score'])
+        worst = '-' if row['worst_score'] is None else '{:8.3f}'.format(row['worst_score'])
+        lines.append('{:4d}  {}  {:6d} {:6d} {:>8s} {:>8s}'.format(
+            i + 1, '  '.join('{:>13}'.format(row['knobs'][name]) for name in names),
+            row['trials'], row['failed'], mean, worst))
+    return '\n'.join(lines)
+
+def write_table(rows, filename):
+    names = sorted(knob_defaults)
+    with open(filename, 'w', newline='') as f_out:
+        writer = csv.DictWriter(f_out, fieldnames=['rank'] + names + ['trials', 'failed', 'mean_score', 'worst_score'])
+        writer.writeheader()
+        for i, row in enumerate(rows):
+            line = dict(row['knobs'])
+            line.update({'rank': i + 1, 'trials': row['trials'], 'failed': row['failed'],
+                         'mean_score': row['mean_score'], 'worst_score': row['worst_score']})
+            writer.writerow(line)
+
+# parse a --knob argument such as astar_num=4,6,8
+def parse_knob(text):
+    name, _, values = text.partition('=')
+    if name not in knob_defaults:
+        raise argparse.ArgumentTypeError('unknown knob: {}'.format(name))
+    kind = type(knob_defaults[name])
+    try:
+        return name, [kind(value) for value in values.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('bad values for {}: {}'.format(name, values))
+
+
+if __name__ == '__main__':
+    '''
+    This script sweeps the robot's exploration knobs over every maze given
+    as an argument and many seeds, and prints the knob settings ranked by
+    score.
+    '''
+    parser = argparse.ArgumentParser(description='Sweep the robot exploration knobs.')
+    parser.add_argument('mazes', nargs='+', help='maze files to test')
+    parser.add_argument('--knob', type=parse_knob, action='append', default=[],
+                        help='knob and the values to try, e.g. astar_num=4,6,8 (repeatable)')
+    parser.add_argument('--samples', type=int, help='try this many random points instead of the whole grid')
+    parser.add_argument('--sample-seed', type=int, default=0, help='seed for choosing the random points')
+    parser.add_argument('--seeds', type=int, default=1, help='number of seeds per maze and point, starting at 0')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--cache', help='file of completed trials, for resuming (none by default)')
+    parser.add_argument('--top', type=int, default=20, help='number of rows to print')
+    parser.add_argument('--csv', help='write the whole ranked table to this CSV file')
+    args = parser.parse_args()
+
+    space = dict(args.knob)
+    if args.samples is None:
+        points = grid_points(space)
+    else:
+        points = random_points(space, args.samples, args.sample_seed)
+
+    trials = run_sweep(args.mazes, points, range(args.seeds), args.workers, args.cache)
+    rows = rank(trials)
+    print(format_table(rows[:args.top]))
+    if args.csv:
+        write_table(rows, args.csv)
@@ -1,6 +1,9 @@
 from maze import Maze
 from robot import Robot
-import sys
+from realtime import RemoteRobot, late_policies, format_stats
+import argparse
+import functools
+import time
 
 # global dictionaries for robot movement and sensing
 dir_sensors = {'u': ['l', 'u', 'r'], 'r': ['u', 'r', 'd'],
@@ -16,23 +19,64 @@ dir_reverse = {'u': 'd', 'r': 'l', 'd': 'u', 'l': 'r',
 max_time = 1000
 train_score_mult = 1/30.
 
-if __name__ == '__main__':
-    '''
-    This script tests a robot based on the code in robot.py on a maze given
-    as an argument when running the script.
+def run_trial(maze, robot_factory, verbose=False, profiler=None, recorder=None, first_run=None,
+              deadline=None, late_policy='noop'):
     '''
+    Tests one robot on a maze over two runs. robot_factory is called with
+    the maze dimension and must return the robot. Returns a dictionary with
+    the time steps of each completed run ('runtimes'), the score (None if
+    the robot did not complete both runs), whether each run entered the goal
+    ('hit_goal'), the total time steps used ('total_time'), the number of
+    robot moves in each run ('moves') and the wall-clock time in seconds.
+    hit_goal and moves have one entry per run started; a run is not started
+    when no time step is left for it.
+    Progress messages are printed only if verbose is set. profiler, if
+    given, is told about every step and phase of the loop (see
+    stepprofile.StepProfiler). recorder, if given, receives every step's
+    state and action (see trialtrace.TraceRecorder). first_run, if given,
+    is the result of a first run done earlier ({'runtime': time steps,
+    'moves': robot moves}); the first run is then skipped, and the robot
+    must already be set up for the second one.
 
-    # Create a maze based on input argument on command line.
-    testmaze = Maze( str(sys.argv[1]) )
+    deadline, if given, runs the robot in a worker process (see
+    realtime.RemoteRobot) and gives every next_move call that many
+    wall-clock seconds. A late call is handled by late_policy: with 'noop'
+    the robot does not move in that time step, nor in the following ones
+    until its action arrives (each one waits up to deadline again), and
+    then the action is carried out; 'fail' ends the trial without a score. The
+    result then also holds the next_move latency statistics ('latency')
+    and whether a late call failed the trial ('late_failure').
+    '''
+    if late_policy not in late_policies:
+        raise Exception('Unknown late policy: {}'.format(late_policy))
+    start_clock = time.perf_counter()
 
     # Intitialize a robot; robot receives info about maze dimensions.
-    testrobot = Robot(testmaze.dim)
+    remote = None
+    if deadline is None:
+        testrobot = robot_factory(maze.dim)
+    else:
+        remote = RemoteRobot(robot_factory, maze.dim)
+    if profiler is not None:
+        profiler.start_trial()
 
     # Record robot performance over two runs.
     runtimes = []
+    hit_goals = []
+    moves = []
     total_time = 0
-    for run in range(2):
-        print("Starting run {}.".format(run))
+    late_failure = False
+    if first_run is not None:
+        runtimes.append(first_run['runtime'])
+        hit_goals.append(True)
+        moves.append(first_run['moves'])
+        total_time = first_run['runtime']
+    for run in range(len(runtimes), 2):
+        # a run without a single time step left is not started
+        if total_time >= max_time:
+            break
+        if verbose:
+            print("Starting run {}.".format(run))
 
         # Set the robot in the start position. Note that robot position
         # parameters are independent of the robot itself.
@@ -40,32 +84,61 @@ if __name__ == '__main__':
 
         run_active = True
         hit_goal = False
+        run_moves = 0
         while run_active:
             # check for end of time
             total_time += 1
             if total_time > max_time:
                 run_active = False
-                print("Allotted time exceeded.")
+                if verbose:
+                    print("Allotted time exceeded.")
                 
                 break
 
             # provide robot with sensor information, get actions
-            sensing = [testmaze.dist_to_wall(robot_pos['location'], heading)
+            if profiler is not None:
+                profiler.begin_step(run, total_time)
+            sensing = [maze.dist_to_wall(robot_pos['location'], heading)
                        for heading in dir_sensors[robot_pos['heading']]]
-            rotation, movement = testrobot.next_move(sensing)
+            if profiler is not None:
+                profiler.mark('sense')
+            if remote is None:
+                rotation, movement = testrobot.next_move(sensing)
+            else:
+                action = remote.call(sensing, deadline)
+                if action is None and late_policy == 'fail':
+                    late_failure = True
+                    if verbose:
+                        print("Deadline missed, trial failed.")
+                    break
+                elif action is None:
+                    action = (0, 0)
+                    if verbose:
+                        print("Deadline missed, robot waits.")
+                rotation, movement = action
+            run_moves += 1
+            if profiler is not None:
+                profiler.mark('robot', rotation=rotation, movement=movement)
+            if recorder is not None:
+                recorder.record(run, total_time, robot_pos, sensing, rotation, movement)
 
             # check for a reset
             if (rotation, movement) == ('Reset', 'Reset'):
+                if profiler is not None:
+                    profiler.end_step(robot_pos)
                 if run == 0 and hit_goal:
                     run_active = False
                     runtimes.append(total_time)
-                    print("Ending first run. Starting next run.")
+                    if verbose:
+                        print("Ending first run. Starting next run.")
                     break
                 elif run == 0 and not hit_goal:
-                    print("Cannot reset - robot has not hit goal yet.")
+                    if verbose:
+                        print("Cannot reset - robot has not hit goal yet.")
                     continue
                 else:
-                    print("Cannot reset on runs after the first.")
+                    if verbose:
+                        print("Cannot reset on runs after the first.")
                     continue
 
             # perform rotation
@@ -75,41 +148,123 @@ if __name__ == '__main__':
                 robot_pos['heading'] = dir_sensors[robot_pos['heading']][2]
             elif rotation == 0:
                 pass
-            else:
+            elif verbose:
                 print("Invalid rotation value, no rotation performed.")
+            if profiler is not None:
+                profiler.mark('rotate')
 
             # perform movement
-            if abs(movement) > 3:
+            if abs(movement) > 3 and verbose:
                 print("Movement limited to three squares in a turn.")
             movement = max(min(int(movement), 3), -3) # fix to range [-3, 3]
             while movement:
                 if movement > 0:
-                    if testmaze.is_permissible(robot_pos['location'], robot_pos['heading']):
+                    if maze.is_permissible(robot_pos['location'], robot_pos['heading']):
                         robot_pos['location'][0] += dir_move[robot_pos['heading']][0]
                         robot_pos['location'][1] += dir_move[robot_pos['heading']][1]
                         movement -= 1
                     else:
-                        print("Movement stopped by wall.")
+                        if verbose:
+                            print("Movement stopped by wall.")
                         movement = 0
                 else:
                     rev_heading = dir_reverse[robot_pos['heading']]
-                    if testmaze.is_permissible(robot_pos['location'], rev_heading):
+                    if maze.is_permissible(robot_pos['location'], rev_heading):
                         robot_pos['location'][0] += dir_move[rev_heading][0]
                         robot_pos['location'][1] += dir_move[rev_heading][1]
                         movement += 1
                     else:
-                        print("Movement stopped by wall.")
+                        if verbose:
+                            print("Movement stopped by wall.")
                         movement = 0
+            if profiler is not None:
+                profiler.mark('move')
 
             # check for goal entered
-            goal_bounds = [testmaze.dim/2 - 1, testmaze.dim/2]
+            goal_bounds = [maze.dim/2 - 1, maze.dim/2]
             if robot_pos['location'][0] in goal_bounds and robot_pos['location'][1] in goal_bounds:
                 hit_goal = True
                 if run != 0:
                     runtimes.append(total_time - sum(runtimes))
                     run_active = False
-                    print("Goal found; run {} completed!".format(run))
+                    if verbose:
+                        print("Goal found; run {} completed!".format(run))
+            if profiler is not None:
+                profiler.mark('goal')
+                profiler.end_step(robot_pos)
 
-    # Report score if robot is successful.
+        hit_goals.append(hit_goal)
+        moves.append(run_moves)
+        if late_failure:
+            break
+
+    if profiler is not None:
+        profiler.end_trial()
+
+    score = None
     if len(runtimes) == 2:
-        print("Task complete! Score: {:4.3f}".format(runtimes[1] + train_score_mult*runtimes[0]))
\ No newline at end of file
+        score = runtimes[1] + train_score_mult*runtimes[0]
+
+    result = {'dim': maze.dim,
+              'runtimes': runtimes,
+              'score': score,
+              'hit_goal': hit_goals,
+              'total_time': min(total_time, max_time),
+              'moves': moves,
+              'wall_time': time.perf_counter() - start_clock}
+    if remote is not None:
+        remote.close()
+        result['latency'] = remote.stats()
+        result['late_failure'] = late_failure
+    return result
+
+
+if __name__ == '__main__':
+    '''
+    This script tests a robot based on the code in robot.py on a maze given
+    as an argument when running the script. If a second argument is given,
+    a binary trace of the trial is written to that file. With --deadline,
+    every next_move call gets that many milliseconds of wall-clock time.
+    With --solution, the minimum possible score is printed too, through the
+    on-disk solution cache. --plan-budget and --plan-time cap the robot's
+    planning work per next_move call (see Robot).
+    '''
+    # imported here, these modules themselves import this one
+    import solutioncache
+    import trialtrace
+
+    parser = argparse.ArgumentParser(description='Test the robot on a maze.')
+    parser.add_argument('maze', help='maze file')
+    parser.add_argument('trace', nargs='?', help='write a binary trace of the trial to this file')
+    parser.add_argument('--deadline', type=float, help='milliseconds allowed for each next_move call')
+    parser.add_argument('--late', choices=late_policies, default='noop', help='what a late call does')
+    parser.add_argument('--solution', action='store_true', help='print the minimum possible score (uses the solution cache)')
+    parser.add_argument('--plan-budget', type=int, help='most planning steps in one next_move call')
+    parser.add_argument('--plan-time', type=float, help='most milliseconds of planning in one next_move call')
+    args = parser.parse_args()
+
+    # Create a maze based on input argument on command line.
+    testmaze = Maze(args.maze)
+
+    # Record a trace of every step if a trace file name is given.
+    recorder = None
+    if args.trace:
+        recorder = trialtrace.TraceRecorder(testmaze.dim)
+
+    deadline = None if args.deadline is None else args.deadline / 1e3
+    plan_time = None if args.plan_time is None else args.plan_time / 1e3
+    robot_factory = functools.partial(Robot, plan_budget=args.plan_budget, plan_time=plan_time)
+    result = run_trial(testmaze, robot_factory, verbose=True, recorder=recorder,
+                       deadline=deadline, late_policy=args.late)
+
+    if recorder is not None:
+        trialtrace.write_trace(recorder.trace, testmaze.dim, args.trace)
+    if 'latency' in result:
+        print("next_move latency: {}".format(format_stats(result['latency'])))
+
+    # Report score if robot is successful.
+    if result['score'] is not None:
+        print("Task complete! Score: {:4.3f}".format(result['score']))
+    if args.solution:
+        solution = solutioncache.get_solution(testmaze)
+        print("Minimum possible score: {:4.3f}".format(float(solution['min_score'])))
@@ -0,0 +1,134 @@
+import numpy as np
+import numbers
+
+class TiledArray(object):
+    def __init__(self, shape, dtype, fill=0, tile_size=32):
+        '''
+        2D array stored as square tile_size x tile_size NumPy chunks that are
+        only allocated once a value other than fill is written into them, so
+        memory follows the part of the array in use. Indexing works like a
+        NumPy array for single elements (a[x, y], negative indices included)
+        and for rectangular slices with step 1 (a[x0:x1, y0:y1]), which read
+        as a dense copy and write a scalar or a matching block. a[...] = v
+        (or a[:] = v) replaces the whole content. np.asarray(a) and a.copy()
+        give the dense array.
+        '''
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.ndim = 2
+        self.fill = self.dtype.type(fill)
+        self.tile_size = tile_size
+        self.tiles = {}
+
+    @property
+    def size(self):
+        return self.shape[0] * self.shape[1]
+
+    # bytes held by the allocated tiles
+    @property
+    def nbytes(self):
+        return sum(tile.nbytes for tile in self.tiles.values())
+
+    def index(self, i, axis):
+        i = int(i)
+        if i < 0:
+            i += self.shape[axis]
+        if not 0 <= i < self.shape[axis]:
+            raise IndexError('index {} is out of bounds for axis {} with size {}'.format(i, axis, self.shape[axis]))
+        return i
+
+    # a key as (x0, x1, y0, y1) bounds, and whether it picks a single element
+    def bounds(self, key):
+        if key is Ellipsis or (isinstance(key, slice) and key == slice(None)):
+            return 0, self.shape[0], 0, self.shape[1], False
+        if not isinstance(key, tuple) or len(key) != 2:
+            raise IndexError('TiledArray takes two indices')
+        limits = []
+        scalar = True
+        for axis, k in enumerate(key):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(self.shape[axis])
+                if step != 1:
+                    raise IndexError('TiledArray slices must have step 1')
+                limits += [start, max(start, stop)]
+                scalar = False
+            elif isinstance(k, numbers.Integral):
+                i = self.index(k, axis)
+                limits += [i, i + 1]
+            else:
+                raise IndexError('TiledArray takes integers and slices')
+        return limits[0], limits[1], limits[2], limits[3], scalar
+
+    # the allocated tiles overlapping a block, as (tile key, block slices, tile slices)
+    def overlaps(self, x0, x1, y0, y1):
+        size = self.tile_size
+        for tx in range(x0 // size, (x1 - 1) // size + 1 if x1 > x0 else 0):
+            for ty in range(y0 // size, (y1 - 1) // size + 1 if y1 > y0 else 0):
+                ax0, ax1 = max(x0, tx * size), min(x1, (tx + 1) * size)
+                ay0, ay1 = max(y0, ty * size), min(y1, (ty + 1) * size)
+                yield ((tx, ty),
+                       (slice(ax0 - x0, ax1 - x0), slice(ay0 - y0, ay1 - y0)),
+                       (slice(ax0 - tx * size, ax1 - tx * size), slice(ay0 - ty * size, ay1 - ty * size)))
+
+    def __getitem__(self, key):
+        # fast path for the most common case, one element at non-negative indices
+        try:
+            x, y = key
+            if 0 <= x < self.shape[0] and 0 <= y < self.shape[1]:
+                tile = self.tiles.get((x // self.tile_size, y // self.tile_size))
+                if tile is None:
+                    return self.fill
+                return tile[x % self.tile_size, y % self.tile_size]
+        except (TypeError, ValueError):
+            pass
+        x0, x1, y0, y1, scalar = self.bounds(key)
+        block = np.full((x1 - x0, y1 - y0), self.fill, dtype=self.dtype)
+        for tile_key, block_part, tile_part in self.overlaps(x0, x1, y0, y1):
+            tile = self.tiles.get(tile_key)
+            if tile is not None:
+                block[block_part] = tile[tile_part]
+        if scalar:
+            return block[0, 0]
+        return block
+
+    def __setitem__(self, key, value):
+        if isinstance(key, tuple) and len(key) == 2 and all(isinstance(k, numbers.Integral) for k in key):
+            x = self.index(key[0], 0)
+            y = self.index(key[1], 1)
+            tile_key = (x // self.tile_size, y // self.tile_size)
+            tile = self.tiles.get(tile_key)
+            if tile is None:
+                if value == self.fill:
+                    return
+                tile = self.tiles[tile_key] = np.full((self.tile_size, self.tile_size), self.fill, dtype=self.dtype)
+            tile[x % self.tile_size, y % self.tile_size] = value
+            return
+        x0, x1, y0, y1, scalar = self.bounds(key)
+        whole = (x0, x1, y0, y1) == (0, self.shape[0], 0, self.shape[1])
+        if whole and np.ndim(value) == 0:
+            self.tiles = {}
+            self.fill = self.dtype.type(value)
+            return
+        block = np.broadcast_to(np.asarray(value, dtype=self.dtype), (x1 - x0, y1 - y0))
+        for tile_key, block_part, tile_part in self.overlaps(x0, x1, y0, y1):
+            tile = self.tiles.get(tile_key)
+            if tile is None:
+                if (block[block_part] == self.fill).all():
+                    continue
+                tile = self.tiles[tile_key] = np.full((self.tile_size, self.tile_size), self.fill, dtype=self.dtype)
+            tile[tile_part] = block[block_part]
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self[...]
+        if dtype is not None:
+            dense = dense.astype(dtype)
+        return dense
+
+    def copy(self):
+        return self[...]
+
+    # origin and extent of every allocated tile, clipped to the array
+    def tile_bounds(self):
+        size = self.tile_size
+        for tx, ty in sorted(self.tiles):
+            yield tx * size, min((tx + 1) * size, self.shape[0]), ty * size, min((ty + 1) * size, self.shape[1])
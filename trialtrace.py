@@ -0,0 +1,182 @@
+from maze import Maze
+from tester import run_trial, max_time, train_score_mult
+import numpy as np
+import argparse
+import struct
+import sys
+
+def step_dtype(dim):
+    '''
+    Record type of one tester step in a maze of dimension dim: the time
+    counter, the run, the robot's location and heading (index into
+    headings) when it was sensing, the three sensor readings, and the
+    rotation and movement it chose. Locations and sensor readings take the
+    smallest unsigned type that holds dim, one byte up to 255.
+    '''
+    cell = np.dtype(np.min_scalar_type(dim)).newbyteorder('<')
+    return np.dtype([('time', '<u2'), ('run', 'u1'), ('x', cell), ('y', cell),
+                     ('heading', 'u1'), ('sensors', cell, 3),
+                     ('rotation', 'i1'), ('movement', 'i1')])
+
+# rotation and movement of a ('Reset', 'Reset') step
+reset_code = -128
+
+headings = ['u', 'r', 'd', 'l']
+heading_move = np.array([[0, 1], [1, 0], [0, -1], [-1, 0]])
+
+# trace files: a 16 byte header (magic, little-endian uint32 maze dim and
+# step count, 4 reserved bytes) followed by the step records
+trace_magic = b'MZT1'
+trace_header = struct.Struct('<4sII4x')
+
+class TraceRecorder(object):
+    def __init__(self, maze_dim):
+        '''
+        Records every step of a tester.run_trial call in a maze of dimension
+        maze_dim into a fixed-width record array. Pass it as
+        run_trial(..., recorder=...).
+        '''
+        self.records = np.zeros(max_time, dtype=step_dtype(maze_dim))
+        self.count = 0
+
+    def record(self, run, total_time, robot_pos, sensing, rotation, movement):
+        step = self.records[self.count]
+        step['time'] = total_time
+        step['run'] = run
+        step['x'], step['y'] = robot_pos['location']
+        step['heading'] = headings.index(robot_pos['heading'][0])
+        step['sensors'] = sensing
+        if (rotation, movement) == ('Reset', 'Reset'):
+            step['rotation'] = step['movement'] = reset_code
+        else:
+            step['rotation'] = rotation if rotation in (-90, 0, 90) else 0
+            step['movement'] = max(min(int(movement), 3), -3)
+        self.count += 1
+
+    @property
+    def trace(self):
+        return self.records[:self.count]
+
+def write_trace(trace, dim, filename):
+    with open(filename, 'wb') as f_out:
+        f_out.write(trace_header.pack(trace_magic, dim, len(trace)))
+        f_out.write(np.ascontiguousarray(trace, dtype=step_dtype(dim)).tobytes())
+
+def read_trace(filename):
+    '''
+    Returns (dim, trace) of a trace file, with trace a step_dtype(dim) array.
+    '''
+    with open(filename, 'rb') as f_in:
+        magic, dim, count = trace_header.unpack(f_in.read(trace_header.size))
+        if magic != trace_magic:
+            raise Exception('Not a trace file!')
+        trace = np.fromfile(f_in, dtype=step_dtype(dim), count=count)
+    return dim, trace
+
+def score_trace(trace, maze):
+    '''
+    Checks a recorded trace against a maze and scores it, with array
+    operations over all steps and without a robot. Every step's sensor
+    readings and the location the next step starts from are compared with
+    what the tester would have produced; the first step where they differ
+    is returned as 'mismatch' (None if the whole trace is consistent).
+    The other keys are those of tester.run_trial apart from wall_time.
+    '''
+    x = trace['x'].astype(int)
+    y = trace['y'].astype(int)
+    heading = trace['heading'].astype(int)
+    run = trace['run'].astype(int)
+    reset = trace['rotation'] == reset_code
+
+    # sensor readings: left, forward and right of the heading
+    turns = np.array([-1, 0, 1])
+    sensed = maze.wall_dist[(heading[:, None] + turns) % 4, x[:, None], y[:, None]]
+    bad = (sensed != trace['sensors']).any(axis=1)
+
+    # end of every step: rotate, then move until the movement is used up or a wall is hit
+    rotation = np.where(reset, 0, trace['rotation'].astype(int) // 90)
+    movement = np.where(reset, 0, trace['movement'].astype(int))
+    new_heading = (heading + rotation) % 4
+    direction = np.where(movement >= 0, new_heading, (new_heading + 2) % 4)
+    distance = np.minimum(np.abs(movement), maze.wall_dist[direction, x, y])
+    end_x = x + heading_move[direction, 0] * distance
+    end_y = y + heading_move[direction, 1] * distance
+    end_heading = np.where(reset, heading, new_heading)
+
+    # every step starts where the previous one ended, unless a new run began
+    same_run = run[1:] == run[:-1]
+    bad[1:] |= same_run & ((x[1:] != end_x[:-1]) | (y[1:] != end_y[:-1]) | (heading[1:] != end_heading[:-1]))
+    bad[1:] |= ~same_run & ((x[1:] != 0) | (y[1:] != 0) | (heading[1:] != 0))
+    mismatch = np.flatnonzero(bad)
+
+    goal_bounds = [maze.dim // 2 - 1, maze.dim // 2]
+    in_goal = np.isin(end_x, goal_bounds) & np.isin(end_y, goal_bounds) & ~reset
+    # like run_trial, one entry per run started; run 1 is started if it has a step
+    started = 2 if (run == 1).any() else 1
+    hit_goal = [bool(in_goal[run == r].any()) for r in range(started)]
+    moves = [int(count) for count in np.bincount(run, minlength=2)[:started]]
+
+    runtimes = []
+    if (run == 1).any():
+        runtimes.append(int(trace['time'][run == 0][-1]))
+        if in_goal[-1] and run[-1] == 1:
+            runtimes.append(int(trace['time'][-1]) - runtimes[0])
+    score = None
+    total_time = max_time
+    if len(runtimes) == 2:
+        score = runtimes[1] + train_score_mult*runtimes[0]
+        total_time = int(trace['time'][-1])
+
+    return {'dim': maze.dim,
+            'runtimes': runtimes,
+            'score': score,
+            'hit_goal': hit_goal,
+            'total_time': total_time,
+            'moves': moves,
+            'mismatch': int(mismatch[0]) if len(mismatch) else None}
+
+class ReplayRobot(object):
+    def __init__(self, maze_dim, trace):
+        '''
+        Plays the actions of a recorded trace back in order, regardless of
+        what it senses, so that a trace can be re-simulated with
+        tester.run_trial on the same or on another maze.
+        '''
+        self.maze_dim = maze_dim
+        self.actions = [('Reset', 'Reset') if rotation == reset_code else (int(rotation), int(movement))
+                        for rotation, movement in zip(trace['rotation'], trace['movement'])]
+        self.actions.reverse()
+
+    def next_move(self, sensors):
+        if not self.actions:
+            return 0, 0
+        return self.actions.pop()
+
+def resimulate(trace, maze, recorder=None):
+    return run_trial(maze, lambda dim: ReplayRobot(dim, trace), recorder=recorder)
+
+if __name__ == '__main__':
+    '''
+    This script checks and scores recorded trace files against a maze
+    without running the robot.
+    '''
+    parser = argparse.ArgumentParser(description='Check and score recorded trials against a maze.')
+    parser.add_argument('maze', help='maze file')
+    parser.add_argument('traces', nargs='+', help='trace files recorded on this maze')
+    args = parser.parse_args()
+
+    maze = Maze(args.maze)
+    failed = 0
+    for filename in args.traces:
+        dim, trace = read_trace(filename)
+        if dim != maze.dim:
+            raise Exception('Trace {} was recorded on a maze of dimension {}!'.format(filename, dim))
+        result = score_trace(trace, maze)
+        score = 'failed' if result['score'] is None else '{:4.3f}'.format(result['score'])
+        if result['mismatch'] is None:
+            print('{}: {}'.format(filename, score))
+        else:
+            failed += 1
+            print('{}: {}, differs from the maze at step {}'.format(filename, score, result['mismatch']))
+    if failed:
+        sys.exit(1)